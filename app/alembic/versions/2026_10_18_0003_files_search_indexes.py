@@ -0,0 +1,43 @@
+"""files: pg_trgm index for filename search, lower(ext) index
+
+Revision ID: 0003_files_search_indexes
+Revises: 0002_files_visibility_status
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_files_search_indexes"
+down_revision = "0002_files_visibility_status"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Нормализуем расширения, чтобы фильтр по ext был простым равенством
+    op.execute("UPDATE files SET ext = lower(ext) WHERE ext <> lower(ext)")
+
+    # На больших таблицах строим индексы без блокировки записи
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_filename_trgm",
+            "files",
+            ["filename_original"],
+            postgresql_using="gin",
+            postgresql_ops={"filename_original": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_files_ext_lower",
+            "files",
+            [sa.text("lower(ext)")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_files_ext_lower", table_name="files", postgresql_concurrently=True)
+        op.drop_index("ix_files_filename_trgm", table_name="files", postgresql_concurrently=True)
+    # расширение pg_trgm не удаляем: им могут пользоваться другие объекты
@@ -0,0 +1,32 @@
+"""files: content_tsv tsvector column with GIN index
+
+Revision ID: 0004_files_content_tsv
+Revises: 0003_files_search_indexes
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004_files_content_tsv"
+down_revision = "0003_files_search_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Заполняется Celery-задачей извлечения метаданных; старые файлы остаются NULL
+    op.add_column("files", sa.Column("content_tsv", postgresql.TSVECTOR(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_content_tsv",
+            "files",
+            ["content_tsv"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_files_content_tsv", table_name="files", postgresql_concurrently=True)
+    op.drop_column("files", "content_tsv")
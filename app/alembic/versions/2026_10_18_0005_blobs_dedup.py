@@ -0,0 +1,49 @@
+"""blobs: content-addressed storage with refcount; files.blob_id
+
+Revision ID: 0005_blobs_dedup
+Revises: 0004_files_content_tsv
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005_blobs_dedup"
+down_revision = "0004_files_content_tsv"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("s3_key", sa.String(length=512), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column(
+            "status",
+            postgresql.ENUM("PENDING", "READY", "FAILED", name="filestatus", create_type=False),
+            nullable=False,
+            server_default=sa.text("'PENDING'"),
+        ),
+        sa.Column("metadata", postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+        sa.Column("content_tsv", postgresql.TSVECTOR(), nullable=True),
+        sa.UniqueConstraint("sha256", name="uq_blobs_sha256"),
+        sa.UniqueConstraint("s3_key", name="uq_blobs_s3_key"),
+    )
+
+    op.add_column("files", sa.Column("blob_id", sa.Integer(), sa.ForeignKey("blobs.id"), nullable=True))
+    op.create_index("ix_files_blob_id", "files", ["blob_id"])
+
+    # Несколько File могут ссылаться на один объект S3
+    op.drop_constraint("uq_files_s3_key", "files", type_="unique")
+    op.create_index("ix_files_s3_key", "files", ["s3_key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_s3_key", table_name="files")
+    op.create_unique_constraint("uq_files_s3_key", "files", ["s3_key"])
+    op.drop_index("ix_files_blob_id", table_name="files")
+    op.drop_column("files", "blob_id")
+    op.drop_table("blobs")
@@ -0,0 +1,39 @@
+"""files: deleted_at tombstone with partial indexes
+
+Revision ID: 0006_files_soft_delete
+Revises: 0005_blobs_dedup
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_files_soft_delete"
+down_revision = "0005_blobs_dedup"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_live",
+            "files",
+            ["id"],
+            postgresql_where=sa.text("deleted_at IS NULL"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_files_deleted_at",
+            "files",
+            ["deleted_at"],
+            postgresql_where=sa.text("deleted_at IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_files_deleted_at", table_name="files", postgresql_concurrently=True)
+        op.drop_index("ix_files_live", table_name="files", postgresql_concurrently=True)
+    op.drop_column("files", "deleted_at")
@@ -0,0 +1,74 @@
+"""files: row version from a sequence, bumped by trigger on every UPDATE
+
+Revision ID: 0007_files_version
+Revises: 0006_files_soft_delete
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_files_version"
+down_revision = "0006_files_soft_delete"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 10_000
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE files_version_seq")
+    # Колонка без default и NULL-допустимая — только изменение каталога. С volatile default
+    # (nextval) ADD COLUMN переписал бы всю таблицу под ACCESS EXCLUSIVE
+    op.add_column("files", sa.Column("version", sa.BigInteger(), nullable=True))
+    op.execute("ALTER SEQUENCE files_version_seq OWNED BY files.version")
+    # default на существующей колонке действует только на новые строки, таблицу не трогает
+    op.execute("ALTER TABLE files ALTER COLUMN version SET DEFAULT nextval('files_version_seq')")
+
+    # Любой UPDATE (API, Celery, сброс счётчиков) получает новую версию — ETag не зависит от кода
+    op.execute(
+        """
+        CREATE FUNCTION files_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('files_version_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER files_bump_version BEFORE UPDATE ON files "
+        "FOR EACH ROW EXECUTE FUNCTION files_bump_version()"
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        # Существующие строки — пачками по id, каждая пачка в своей транзакции (версию ставит триггер)
+        lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM files")).one()
+        if lo is not None:
+            for start in range(lo, hi + 1, BACKFILL_BATCH):
+                bind.execute(
+                    sa.text(
+                        "UPDATE files SET version = nextval('files_version_seq') "
+                        "WHERE id >= :start AND id < :stop AND version IS NULL"
+                    ),
+                    {"start": start, "stop": start + BACKFILL_BATCH},
+                )
+
+        # NOT NULL без полного скана под ACCESS EXCLUSIVE: проверенный CHECK позволяет
+        # SET NOT NULL пропустить проверку строк (Postgres 12+)
+        bind.execute(sa.text(
+            "ALTER TABLE files ADD CONSTRAINT files_version_not_null CHECK (version IS NOT NULL) NOT VALID"
+        ))
+        bind.execute(sa.text("ALTER TABLE files VALIDATE CONSTRAINT files_version_not_null"))
+        bind.execute(sa.text("ALTER TABLE files ALTER COLUMN version SET NOT NULL"))
+        bind.execute(sa.text("ALTER TABLE files DROP CONSTRAINT files_version_not_null"))
+
+        op.create_index("ix_files_version", "files", ["version"], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_files_version", table_name="files", postgresql_concurrently=True)
+    op.execute("DROP TRIGGER files_bump_version ON files")
+    op.execute("DROP FUNCTION files_bump_version()")
+    op.drop_column("files", "version")  # sequence удалится вместе с колонкой (OWNED BY)
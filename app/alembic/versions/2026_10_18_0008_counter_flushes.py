@@ -0,0 +1,26 @@
+"""counter_flushes: ids of applied download-counter snapshots
+
+Revision ID: 0008_counter_flushes
+Revises: 0007_files_version
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_counter_flushes"
+down_revision = "0007_files_version"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "counter_flushes",
+        sa.Column("flush_id", sa.String(length=32), primary_key=True),
+        sa.Column("applied_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index("ix_counter_flushes_applied_at", "counter_flushes", ["applied_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_counter_flushes_applied_at", table_name="counter_flushes")
+    op.drop_table("counter_flushes")
@@ -6,7 +6,7 @@ from sqlalchemy import select
 from app.core.deps import  get_current_user
 from app.db.session import get_db
 
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token, verify_password_async
 from app.schemas.auth import LoginRequest, TokenResponse
 from app.schemas.user import UserOut
 from app.db.models.user import User
@@ -17,7 +17,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     email = data.email.strip().lower()
     user = await db.scalar(select(User).where(User.email == email))
-    if not user or not verify_password(data.password, user.password_hash):
+    if not user or not user.is_active or not await verify_password_async(data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
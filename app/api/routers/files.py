@@ -1,49 +1,130 @@
 # app/api/routers/files.py
+import asyncio
+import hashlib
+import io
+import json
+import math
 import mimetypes
-from io import BytesIO
-from uuid import uuid4
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Optional, Union
 
-from fastapi import APIRouter, Depends, File as FileUpload, Form, HTTPException, UploadFile, Query, status
-from fastapi.responses import RedirectResponse
-from fastapi_pagination import Page, paginate
+from fastapi import (
+    APIRouter,
+    Depends,
+    File as FileUpload,
+    Form,
+    HTTPException,
+    Request,
+    UploadFile,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
+from fastapi_pagination import Page, Params
+from jose import JWTError
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, or_, select, update, delete
+from sqlalchemy import and_, func, or_, select, update
 
-from app.core.deps import get_current_user
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.deps import authenticate_token, get_current_user, get_stream_token, get_stream_user
+from app.core.principal_cache import decode_token_cached
+from app.core.security import create_access_token, decode_access_token
+from app.db.session import async_session_maker, get_db
 
 from app.db.models.user import User
 from app.db.models.file import File
 from app.db.models.enums import FileStatus, UserRole, Visibility
-from app.schemas.file import FileOut, UploadResponse, VisibilityIn
-from app.services.storage_s3 import S3Client
-from app.tasks.metadata import extract_metadata_task
-from app.utils.validators import ensure_upload_allowed
-from app.utils.magic import sniff_mime, ensure_mime_matches_ext
+from app.schemas.file import (
+    BatchUploadItem,
+    BatchUploadResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    FileCursorPage,
+    FileOut,
+    FinalizeUploadRequest,
+    PresignUploadRequest,
+    PresignUploadResponse,
+    UploadPartOut,
+    UploadResponse,
+    UploadSessionCreate,
+    UploadSessionOut,
+    VisibilityIn,
+)
+from app.services.counters import incr_download
+from app.services.events import get_file_events
+from app.services.blobs import blob_exists
+from app.services.file_cache import FileRecord, get_file_record, invalidate_file_records
+from app.services.fts import fts_query
+from app.services.inline_metadata import try_extract_inline
+from app.services.presign_cache import presigned_download_url
+from app.services.ingest import (
+    ReceivedUpload,
+    new_object_key,
+    register_upload,
+    register_uploads,
+    split_ext,
+    staging_key,
+)
+from app.services.storage_s3 import AsyncS3Client, get_async_s3
+from app.services.upload_sessions import (
+    UploadSession,
+    contiguous_offset,
+    create_session,
+    drop_session,
+    load_session,
+    lock_completion,
+    record_part,
+    unlock_completion,
+    uploaded_parts,
+)
+from app.services.upload_stream import StreamedUpload, stream_to_s3
+from app.services.zip_stream import ZipEntry, stream_zip, unique_names
+from app.tasks.metadata import extract_metadata_batch_task, extract_metadata_task
+from app.utils.http import RangeNotSatisfiable, content_disposition, if_none_match, if_range, parse_range
+from app.utils.validators import ensure_upload_allowed, max_upload_bytes
+from app.utils.magic import sniff_mime, ensure_mime_matches_ext, serve_mime
 
 router = APIRouter()
 
 
 def _visibility_filter(user: User):
+    # удалённые (tombstone) не видны никому; частичный индекс ix_files_live
+    live = File.deleted_at.is_(None)
     if user.role in (UserRole.ADMIN, UserRole.MANAGER):
-        return True
-    return or_(
-        File.owner_id == user.id,
-        File.visibility == Visibility.PUBLIC,
-        and_(File.visibility == Visibility.DEPARTMENT, File.department_id == user.department_id),
+        return live
+    return and_(
+        live,
+        or_(
+            File.owner_id == user.id,
+            File.visibility == Visibility.PUBLIC,
+            and_(File.visibility == Visibility.DEPARTMENT, File.department_id == user.department_id),
+        ),
     )
 
 
-def _ensure_read_access(user: User, rec: File):
+async def _get_live_file(db: AsyncSession, file_id: int) -> FileRecord:
+    # горячие файлы читаются из кэша записей (Redis + L1), а не из Postgres
+    rec = await get_file_record(db, file_id)
+    if not rec:
+        raise HTTPException(status_code=404, detail="File not found")
+    return rec
+
+
+def _can_read(user: User, owner_id: int, department_id: int, visibility: Visibility) -> bool:
     if user.role in (UserRole.ADMIN, UserRole.MANAGER):
-        return
-    allowed = (
-        rec.owner_id == user.id
-        or rec.visibility == Visibility.PUBLIC
-        or (rec.visibility == Visibility.DEPARTMENT and rec.department_id == user.department_id)
+        return True
+    return (
+        owner_id == user.id
+        or visibility == Visibility.PUBLIC
+        or (visibility == Visibility.DEPARTMENT and department_id == user.department_id)
     )
-    if not allowed:
+
+
+def _ensure_read_access(user: User, rec: File):
+    if not _can_read(user, rec.owner_id, rec.department_id, rec.visibility):
         raise HTTPException(status_code=403, detail="Forbidden")
 
 
@@ -59,6 +140,202 @@ def _ensure_delete_access(user: User, rec: File):
         raise HTTPException(status_code=403, detail="Users can delete only own files")
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class FileFilters:
+    """Общие фильтры списка файлов (используются и в page-, и в cursor-режиме)."""
+
+    def __init__(
+        self,
+        q: Optional[str] = Query(None, description="Поиск по имени файла"),
+        visibility: Optional[VisibilityIn] = Query(None),
+        owner_id: Optional[int] = Query(None),
+        department_id: Optional[int] = Query(None),
+        ext: Optional[str] = Query(None, description="Расширение без точки, напр. pdf"),
+    ):
+        self.q = q
+        self.visibility = visibility
+        self.owner_id = owner_id
+        self.department_id = department_id
+        self.ext = ext
+
+    def apply(self, query, user: User):
+        query = query.where(_visibility_filter(user))
+
+        if self.q:
+            # GIN-индекс pg_trgm (ix_files_filename_trgm) обслуживает ILIKE '%...%'
+            query = query.where(File.filename_original.ilike(f"%{_escape_like(self.q)}%", escape="\\"))
+        if self.visibility:
+            query = query.where(File.visibility == Visibility(self.visibility.value))
+        if self.owner_id:
+            query = query.where(File.owner_id == self.owner_id)
+        if self.ext:
+            # равенство по lower(ext) идёт по индексу ix_files_ext_lower
+            query = query.where(func.lower(File.ext) == self.ext.lower().lstrip("."))
+        if self.department_id is not None:
+            if user.role in (UserRole.ADMIN, UserRole.MANAGER):
+                query = query.where(File.department_id == self.department_id)
+            else:
+                query = query.where(File.department_id == user.department_id)
+        return query
+
+
+def _to_out(r: File) -> FileOut:
+    return FileOut(
+        id=r.id,
+        filename_original=r.filename_original,
+        visibility=r.visibility.value,
+        status=r.status.value,
+        size_bytes=r.size_bytes,
+        mime_type=r.mime_type,
+        ext=r.ext,
+        download_count=r.download_count,
+        metadata=r.meta,  # <-- фикс: meta, не metadata
+    )
+
+
+# поле FileOut -> колонка files: списки и карточка выбирают только нужные колонки
+_OUT_COLUMNS = {
+    "id": File.id,
+    "filename_original": File.filename_original,
+    "visibility": File.visibility,
+    "status": File.status,
+    "size_bytes": File.size_bytes,
+    "mime_type": File.mime_type,
+    "ext": File.ext,
+    "download_count": File.download_count,
+    "metadata": File.meta,
+}
+
+
+class FieldSelection:
+    """?fields=... — какие поля FileOut отдавать (id включается всегда)."""
+
+    def __init__(
+        self,
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, напр. id,filename_original,status"),
+    ):
+        if not fields:
+            self.names = list(_OUT_COLUMNS)
+            return
+        names = ["id", *(f.strip() for f in fields.split(",") if f.strip())]
+        unknown = [n for n in names if n not in _OUT_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        self.names = list(dict.fromkeys(names))
+
+    def columns(self) -> list:
+        return [_OUT_COLUMNS[n].label(n) for n in self.names]
+
+    def pick(self, rec: FileRecord) -> dict:
+        return {n: getattr(rec, _OUT_COLUMNS[n].key) for n in self.names}
+
+
+def _lean_items(rows) -> list[dict]:
+    # Row -> dict по меткам колонок; enum-ы orjson сериализует сам, без pydantic-моделей
+    return [row._asdict() for row in rows]
+
+
+async def _lean_page(
+    db: AsyncSession, query, params: Params, total: Optional[int] = None, headers: Optional[dict] = None
+) -> ORJSONResponse:
+    """Страница в формате Page[FileOut] из колоночного select, сразу в JSON-байты."""
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    rows = (await db.execute(query.limit(params.size).offset((params.page - 1) * params.size))).all()
+    return ORJSONResponse({
+        "items": _lean_items(rows),
+        "total": total,
+        "page": params.page,
+        "size": params.size,
+        "pages": math.ceil(total / params.size),
+    }, headers=headers)
+
+
+# Клиенты опрашивают карточки и списки, пока файлы в PENDING: ответ всегда
+# перепроверяется (no-cache), но при совпадении ETag тело не отправляется
+_REVALIDATE = "private, no-cache"
+
+
+def _etag(*parts) -> str:
+    return '"' + hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:20] + '"'
+
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _REVALIDATE})
+    return None
+
+
+def _scope_etag(request: Request, user: User, *state) -> str:
+    # тело зависит и от прав пользователя, и от параметров запроса
+    return _etag(user.id, user.role.value, user.department_id, request.url.query, *state)
+
+
+async def _receive_upload(
+    s3: AsyncS3Client,
+    user: User,
+    file: UploadFile,
+    visibility: VisibilityIn,
+    skip_if: Optional[Callable[[str], Awaitable[bool]]] = None,
+) -> ReceivedUpload:
+    """Проверки роли/типа/сигнатуры и потоковая загрузка одного UploadFile в S3."""
+    filename = file.filename or "upload.bin"
+    ext = split_ext(filename)
+    role = user.role.value
+
+    # Валидации по роли/типу/видимости до чтения тела; размер проверяется по мере чтения
+    final_visibility = ensure_upload_allowed(role, ext, file.size or 0, visibility.value)
+    detected = ""
+
+    def check_size(size: int) -> None:
+        ensure_upload_allowed(role, ext, size, visibility.value)
+
+    def check_head(head: bytes) -> None:
+        # Фактический MIME по сигнатуре (по первым килобайтам)
+        nonlocal detected
+        detected = sniff_mime(head)  # напр. application/pdf
+        if ext and not ensure_mime_matches_ext(ext, detected):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File content type mismatch: .{ext} vs {detected}",
+            )
+
+    # Потоковая загрузка в S3
+    s3_key = new_object_key(user, ext)
+    uploaded = await stream_to_s3(
+        s3,
+        s3_key,
+        file,
+        check_size,
+        check_head,
+        keep_body=settings.INLINE_METADATA_MAX_BYTES,
+        hash_content=settings.STORAGE_DEDUP,
+        skip_if=skip_if,
+    )
+    mime = file.content_type or (mimetypes.guess_type(filename)[0] or detected or "application/octet-stream")
+    return ReceivedUpload(filename, ext, mime, Visibility(final_visibility), s3_key, uploaded)
+
+
+async def _register(
+    db: AsyncSession, s3: AsyncS3Client, user: User, received: ReceivedUpload
+) -> tuple[File, bool, list[str]]:
+    # Запись в БД (+ дедупликация и извлечение метаданных на месте для небольших файлов)
+    return await register_upload(
+        db,
+        s3,
+        owner=user,
+        filename=received.filename,
+        ext=received.ext,
+        mime=received.mime,
+        visibility=received.visibility,
+        s3_key=received.s3_key,
+        uploaded=received.uploaded,
+    )
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(
     visibility: VisibilityIn = Form(...),
@@ -66,152 +343,740 @@ async def upload_file(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    filename = file.filename or "upload.bin"
-    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-    content = await file.read()
-    size = len(content)
-
-    # Фактический MIME по сигнатуре
-    detected = sniff_mime(content)  # напр. application/pdf
-    if ext and not ensure_mime_matches_ext(ext, detected):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File content type mismatch: .{ext} vs {detected}",
-        )
-    mime = file.content_type or (mimetypes.guess_type(filename)[0] or detected or "application/octet-stream")
+    s3 = get_async_s3()
 
-    # Валидации по роли/размеру/типу/видимости
-    final_visibility = ensure_upload_allowed(current_user.role.value, ext, size, visibility.value)
+    async def already_stored(sha256: str) -> bool:
+        return await blob_exists(db, sha256)
 
-    # Загрузка в S3
-    key_tail = f"{uuid4()}.{ext}" if ext else str(uuid4())
-    s3_key = f"{current_user.department_id}/{current_user.id}/{key_tail}"
-    S3Client().upload_fileobj(s3_key, BytesIO(content))
+    received = await _receive_upload(
+        s3, current_user, file, visibility, skip_if=already_stored if settings.STORAGE_DEDUP else None
+    )
+    rec, needs_task, redundant = await _register(db, s3, current_user, received)
+    await db.commit()
+    await db.refresh(rec)
+    await invalidate_file_records([rec.id])
+    if redundant:
+        # содержимое уже хранится под ключом blob; не удалилось — подберёт сборщик сирот
+        await s3.delete_objects(redundant)
 
-    # Запись в БД
-    rec = File(
-        owner_id=current_user.id,
-        department_id=current_user.department_id,
-        filename_original=filename,
-        s3_key=s3_key,
-        mime_type=mime,
+    # Celery: извлечение метаданных (если не справились на месте)
+    if needs_task:
+        extract_metadata_task.delay(rec.id)
+
+    return UploadResponse(file=_to_out(rec))
+
+
+@router.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    visibility: VisibilityIn = Form(...),
+    files: list[UploadFile] = FileUpload(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Загрузка пачки файлов одним запросом: каждый файл проверяется отдельно и уходит в S3
+    потоком, не больше UPLOAD_BATCH_CONCURRENCY одновременно. Метаданные небольших файлов
+    извлекаются сразу после их загрузки, и тело отпускается — в памяти не больше
+    UPLOAD_BATCH_CONCURRENCY тел. Строки files — одним INSERT, задачи — одной публикацией.
+    Ошибка файла (или регистрации) — ok=False в его элементе, а не 500 на всю пачку.
+    """
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.UPLOAD_BATCH_MAX_FILES} files per batch")
+    s3 = get_async_s3()
+    sem = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+
+    async def receive(file: UploadFile) -> Union[ReceivedUpload, str]:
+        # skip_if не используем: проверка blob ходит в сессию БД, а она одна на запрос
+        async with sem:
+            try:
+                received = await _receive_upload(s3, current_user, file, visibility)
+            except HTTPException as e:
+                return str(e.detail)
+            except Exception:
+                return "Upload failed"
+            if received.uploaded.body is not None:
+                # пул процессов ограничен сам; занят или таймаут — извлечёт Celery
+                received.inline = await try_extract_inline(received.ext, received.uploaded.body)
+                received.uploaded.body = None
+            return received
+
+    results = await asyncio.gather(*(receive(f) for f in files))
+
+    items = [BatchUploadItem(filename=f.filename or "upload.bin", ok=False) for f in files]
+    received: list[tuple[int, ReceivedUpload]] = []
+    for i, r in enumerate(results):
+        if isinstance(r, str):
+            items[i].error = r
+        else:
+            received.append((i, r))
+    if not received:
+        return BatchUploadResponse(items=items)
+
+    try:
+        records, redundant = await register_uploads(db, current_user, [r for _, r in received])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # строки не записались — объекты этой пачки никому не нужны (что не удалилось, подберёт сборщик)
+        await s3.delete_objects([r.s3_key for _, r in received])
+        for i, _ in received:
+            items[i].error = "Registration failed"
+        return BatchUploadResponse(items=items)
+
+    await invalidate_file_records([rec.id for rec in records])
+    if redundant:
+        await s3.delete_objects(redundant)  # не удалилось — подберёт сборщик сирот
+    for (i, _), rec in zip(received, records):
+        items[i].ok, items[i].file = True, _to_out(rec)
+
+    needs_task = [rec.id for rec in records if rec.status == FileStatus.PENDING]
+    if needs_task:
+        extract_metadata_batch_task.delay(needs_task)
+
+    return BatchUploadResponse(items=items)
+
+
+_UPLOAD_TOKEN_TYPE = "upload"
+
+
+@router.post("/upload/presign", response_model=PresignUploadResponse)
+async def presign_upload(
+    body: PresignUploadRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Форма presigned POST для загрузки напрямую в MinIO (байты идут мимо API).
+    Ограничения роли (размер, тип) зашиваются в политику формы; после загрузки
+    клиент вызывает /files/upload/finalize с upload_token. Форма пишет во временный
+    staging-ключ: в итоговый ключ объект копирует только finalize.
+    """
+    ext = split_ext(body.filename)
+    role = current_user.role.value
+    final_visibility = ensure_upload_allowed(role, ext, body.size, body.visibility.value)
+
+    s3_key = new_object_key(current_user, ext)
+    content_type = mimetypes.guess_type(body.filename)[0] or "application/octet-stream"
+    expires = settings.PRESIGNED_UPLOAD_EXPIRES
+    post = get_async_s3().generate_presigned_post(
+        staging_key(s3_key),
+        fields={"Content-Type": content_type},
+        conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_upload_bytes(role)],
+        ],
+        expires_seconds=expires,
+    )
+    token = create_access_token(
+        str(current_user.id),
+        data={
+            "typ": _UPLOAD_TOKEN_TYPE,
+            "key": s3_key,
+            "filename": body.filename,
+            "ext": ext,
+            "vis": final_visibility,
+            "ct": content_type,
+        },
+        expires_min=math.ceil(expires / 60) + 5,  # запас на саму загрузку
+    )
+    return PresignUploadResponse(url=post["url"], fields=post["fields"], upload_token=token, expires_in=expires)
+
+
+@router.post("/upload/finalize", response_model=UploadResponse)
+async def finalize_upload(
+    body: FinalizeUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        claims = decode_access_token(body.upload_token)
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+    if claims.get("typ") != _UPLOAD_TOKEN_TYPE or claims.get("sub") != str(current_user.id):
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+
+    s3_key, ext = claims["key"], claims["ext"]
+    upload_key = staging_key(s3_key)
+    s3 = get_async_s3()
+    try:
+        head = await s3.head_object(upload_key)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Uploaded object not found")
+    size = int(head["ContentLength"])
+
+    # Повторный finalize того же токена не должен плодить записи: сериализуем по ключу
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(s3_key))))
+    if await db.scalar(select(File.id).where(File.s3_key == s3_key)) is not None:
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    # Форма POST в staging действует до своего срока, в итоговый ключ клиент писать не может:
+    # копируем ровно ту версию, что видели в HEAD, и дальше проверяем уже копию
+    try:
+        await s3.copy_object(upload_key, s3_key, if_match=head["ETag"])
+    except Exception:
+        raise HTTPException(status_code=409, detail="Uploaded object changed during finalize")
+    try:
+        await s3.delete_object(upload_key)
+    except Exception:
+        pass  # сирота, подберёт сборщик
+
+    # Политика формы уже ограничила размер, но проверяем ещё раз (роль могла смениться)
+    try:
+        ensure_upload_allowed(current_user.role.value, ext, size, claims["vis"])
+        prefix = await s3.get_range(s3_key, 0, min(size, settings.UPLOAD_SNIFF_BYTES) - 1)
+        detected = sniff_mime(prefix)
+        if ext and not ensure_mime_matches_ext(ext, detected):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File content type mismatch: .{ext} vs {detected}",
+            )
+    except HTTPException:
+        try:
+            await s3.delete_object(s3_key)
+        except Exception:
+            pass  # сирота, подберёт сборщик
+        raise
+
+    # Хэша содержимого нет (байты не проходили через API) — дедупликация не применяется
+    rec, needs_task, _ = await register_upload(
+        db,
+        s3,
+        owner=current_user,
+        filename=claims["filename"],
         ext=ext,
-        size_bytes=size,
-        visibility=Visibility(final_visibility),
-        status=FileStatus.PENDING,
-        meta={},  # важно: meta, не metadata
+        mime=claims["ct"],
+        visibility=Visibility(claims["vis"]),
+        s3_key=s3_key,
+        uploaded=StreamedUpload(size=size),
     )
-    db.add(rec)
     await db.commit()
     await db.refresh(rec)
+    await invalidate_file_records([rec.id])
+
+    if needs_task:
+        extract_metadata_task.delay(rec.id)
+
+    return UploadResponse(file=_to_out(rec))
+
+
+def _session_out(session: UploadSession, parts: dict[int, str]) -> UploadSessionOut:
+    return UploadSessionOut(
+        session_id=session.id,
+        size=session.size,
+        part_size=session.part_size,
+        parts_total=session.parts_total,
+        offset=contiguous_offset(session, parts),
+        received_parts=sorted(parts),
+        missing_parts=[n for n in range(1, session.parts_total + 1) if n not in parts],
+    )
+
+
+async def _owned_session(session_id: str, user: User) -> UploadSession:
+    session = await load_session(session_id)
+    if session is None or session.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post("/upload/sessions", response_model=UploadSessionOut, status_code=201)
+async def create_upload_session(
+    body: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Возобновляемая загрузка большого файла частями. Клиент шлёт части
+    PUT /upload/sessions/{id}/parts/{n} (можно параллельно и повторно),
+    смотрит, что уже дошло, через GET /upload/sessions/{id} и вызывает complete.
+    """
+    ext = split_ext(body.filename)
+    if body.size <= 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+    final_visibility = ensure_upload_allowed(current_user.role.value, ext, body.size, body.visibility.value)
 
-    # Celery: извлечение метаданных
-    extract_metadata_task.delay(rec.id)
-
-    return UploadResponse(
-        file=FileOut(
-            id=rec.id,
-            filename_original=rec.filename_original,
-            visibility=rec.visibility.value,
-            status=rec.status.value,
-            size_bytes=rec.size_bytes,
-            mime_type=rec.mime_type,
-            ext=rec.ext,
-            download_count=rec.download_count,
-            metadata=rec.meta,
+    s3_key = new_object_key(current_user, ext)
+    upload_id = await get_async_s3().create_multipart_upload(s3_key)
+    session = await create_session(
+        owner_id=current_user.id,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        filename=body.filename,
+        ext=ext,
+        visibility=final_visibility,
+        size=body.size,
+    )
+    return _session_out(session, {})
+
+
+@router.get("/upload/sessions/{session_id}", response_model=UploadSessionOut)
+async def get_upload_session(session_id: str, current_user: User = Depends(get_current_user)):
+    session = await _owned_session(session_id, current_user)
+    return _session_out(session, await uploaded_parts(session))
+
+
+@router.put("/upload/sessions/{session_id}/parts/{part_number}", response_model=UploadPartOut)
+async def upload_session_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    session = await _owned_session(session_id, current_user)
+    if not 1 <= part_number <= session.parts_total:
+        raise HTTPException(status_code=400, detail=f"Part number must be in 1..{session.parts_total}")
+    expected = session.part_length(part_number)
+
+    # В памяти не больше одной части (и без копий: BytesIO уходит в boto3 как есть);
+    # лишнее отбрасываем сразу, не дочитывая
+    chunk = io.BytesIO()
+    async for piece in request.stream():
+        chunk.write(piece)
+        if chunk.tell() > expected:
+            raise HTTPException(status_code=413, detail=f"Part {part_number} must be {expected} bytes")
+    if chunk.tell() != expected:
+        raise HTTPException(status_code=400, detail=f"Part {part_number} must be {expected} bytes")
+
+    if part_number == 1 and session.ext:
+        # сигнатура — в первой части: несовпадение отклоняем до complete
+        with chunk.getbuffer() as view:
+            head = bytes(view[: settings.UPLOAD_SNIFF_BYTES])
+        detected = sniff_mime(head)
+        if not ensure_mime_matches_ext(session.ext, detected):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File content type mismatch: .{session.ext} vs {detected}",
+            )
+
+    chunk.seek(0)
+    etag = await get_async_s3().upload_part(session.s3_key, session.upload_id, part_number, chunk)
+    await record_part(session, part_number, etag)
+    return UploadPartOut(part_number=part_number, etag=etag)
+
+
+@router.post("/upload/sessions/{session_id}/complete", response_model=UploadResponse)
+async def complete_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    session = await _owned_session(session_id, current_user)
+    parts = await uploaded_parts(session)
+    missing = [n for n in range(1, session.parts_total + 1) if n not in parts]
+    if missing:
+        raise HTTPException(status_code=409, detail=f"Missing parts: {missing[:20]}")
+    # роль/видимость могли измениться с момента создания сессии
+    ensure_upload_allowed(current_user.role.value, session.ext, session.size, session.visibility)
+    if not await lock_completion(session):
+        raise HTTPException(status_code=409, detail="Upload session is already being completed")
+
+    s3 = get_async_s3()
+    try:
+        await s3.complete_multipart_upload(
+            session.s3_key,
+            session.upload_id,
+            [{"PartNumber": n, "ETag": parts[n]} for n in sorted(parts)],
+        )
+        rec, needs_task, _ = await register_upload(
+            db,
+            s3,
+            owner=current_user,
+            filename=session.filename,
+            ext=session.ext,
+            mime=mimetypes.guess_type(session.filename)[0] or "application/octet-stream",
+            visibility=Visibility(session.visibility),
+            s3_key=session.s3_key,
+            uploaded=StreamedUpload(size=session.size),
         )
+        await db.commit()
+    except BaseException:
+        await unlock_completion(session)
+        raise
+    await drop_session(session)
+    await db.refresh(rec)
+    await invalidate_file_records([rec.id])
+
+    if needs_task:
+        extract_metadata_task.delay(rec.id)
+
+    return UploadResponse(file=_to_out(rec))
+
+
+@router.delete("/upload/sessions/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str, current_user: User = Depends(get_current_user)):
+    session = await _owned_session(session_id, current_user)
+    try:
+        await get_async_s3().abort_multipart_upload(session.s3_key, session.upload_id)
+    except Exception:
+        pass  # уже завершена/прервана — сессию всё равно убираем
+    await drop_session(session)
+    return
+
+
+@router.get("/cursor", response_model=FileCursorPage)
+async def list_files_cursor(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    filters: FileFilters = Depends(),
+    fields: FieldSelection = Depends(),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[int] = Query(None, description="next_cursor из предыдущей страницы"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    # keyset по File.id: стоимость страницы не зависит от её номера и размера таблицы
+    def page_query(*columns):
+        query = filters.apply(select(*columns), current_user)
+        if cursor is not None:
+            query = query.where(File.id > cursor if order == "asc" else File.id < cursor)
+        return query.order_by(File.id.asc() if order == "asc" else File.id.desc()).limit(limit + 1)
+
+    # ETag по (id, version) строк страницы — узкий запрос; тело читаем, только если оно изменилось
+    versions = (await db.execute(page_query(File.id, File.version))).all()
+    etag = _scope_etag(request, current_user, *(f"{r.id}:{r.version}" for r in versions))
+    if (not_modified := _not_modified(request, etag)) is not None:
+        return not_modified
+
+    rows = (await db.execute(page_query(*fields.columns()))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return ORJSONResponse({
+        "items": _lean_items(rows),
+        "next_cursor": rows[-1].id if has_more else None,
+    }, headers={"ETag": etag, "Cache-Control": _REVALIDATE})
+
+
+@router.get("/search", responses={200: {"model": Page[FileOut]}})
+async def search_files(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    q: str = Query(..., min_length=1, description="Поиск по содержимому документов"),
+    fields: FieldSelection = Depends(),
+    params: Params = Depends(),
+):
+    tsquery = fts_query(q)
+    query = select(*fields.columns()).where(File.content_tsv.op("@@")(tsquery), _visibility_filter(current_user))
+    query = query.order_by(func.ts_rank_cd(File.content_tsv, tsquery).desc(), File.id.desc())
+    return await _lean_page(db, query, params)
+
+
+@router.get("/archive")
+async def download_archive(
+    ids: Optional[list[int]] = Query(None, description="id файлов; без ids — все файлы по фильтрам"),
+    filters: FileFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """ZIP с выбранными файлами (или со всеми по фильтрам, как в списке), собирается на лету."""
+    limit = settings.ARCHIVE_MAX_FILES
+    if ids:
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > limit:
+            raise HTTPException(status_code=400, detail=f"At most {limit} files per archive")
+        rows = (await db.scalars(select(File).where(File.id.in_(ids), File.deleted_at.is_(None)))).all()
+        by_id = {r.id: r for r in rows}
+        missing = [i for i in ids if i not in by_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {missing[:20]}")
+        rows = [by_id[i] for i in ids]
+        for r in rows:
+            _ensure_read_access(current_user, r)
+    else:
+        query = filters.apply(select(File), current_user).order_by(File.id).limit(limit + 1)
+        rows = (await db.scalars(query)).all()
+        if len(rows) > limit:
+            raise HTTPException(status_code=400, detail=f"More than {limit} files match; narrow the filter")
+    if not rows:
+        raise HTTPException(status_code=404, detail="No files to archive")
+
+    names = unique_names([r.filename_original for r in rows])
+    entries = [ZipEntry(name, r.s3_key, r.size_bytes) for name, r in zip(names, rows)]
+    # соединение с БД на время отдачи архива не держим
+    await db.close()
+    return StreamingResponse(
+        stream_zip(get_async_s3(), entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition("files.zip", "attachment")},
     )
 
 
+def _event_visible(user: User, event: dict, only: Optional[set[int]]) -> bool:
+    if only is not None and event["file_id"] not in only:
+        return False
+    return _can_read(user, event["owner_id"], event["department_id"], Visibility(event["visibility"]))
+
+
+def _public_event(event: dict) -> dict:
+    return {"file_id": event["file_id"], "status": event["status"], "version": event["version"]}
+
+
+class _StreamPrincipal:
+    """
+    Пользователь долгого соединения: права перепроверяются каждые FILE_EVENTS_HEARTBEAT_SECONDS
+    (деактивация, смена роли/отдела), соединение закрывается не позже exp токена.
+    """
+
+    def __init__(self, token: str, user: User):
+        self.token = token
+        self.user = user
+        self.expires_at = decode_token_cached(token).get("exp", 0)
+        self._next_check = 0.0
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._next_check = min(time.time() + settings.FILE_EVENTS_HEARTBEAT_SECONDS, self.expires_at)
+
+    def due(self) -> bool:
+        return time.time() >= self._next_check
+
+    def wait_timeout(self) -> float:
+        return max(0.0, self._next_check - time.time())
+
+    async def revalidate(self) -> bool:
+        if time.time() >= self.expires_at:
+            return False
+        # снимок из кэша принципалов; в БД — только при промахе
+        async with async_session_maker() as db:
+            try:
+                self.user = await authenticate_token(self.token, db)
+            except HTTPException:
+                return False
+        self._schedule()
+        return True
+
+
+@router.get("/events")
+async def file_events(
+    ids: Optional[list[int]] = Query(None, description="Только эти файлы; по умолчанию — все доступные"),
+    db: AsyncSession = Depends(get_db),
+    token: Optional[str] = Depends(get_stream_token),
+    current_user: User = Depends(get_stream_user),
+):
+    """
+    Server-Sent Events: смены статуса файлов (READY/FAILED после извлечения метаданных),
+    отфильтрованные по тем же правам, что и чтение файла. Заменяет опрос GET /files/{id}.
+    """
+    # соединение с БД на время подписки не держим
+    await db.close()
+    only = set(ids) if ids else None
+    principal = _StreamPrincipal(token, current_user)
+
+    async def stream():
+        async with get_file_events().subscribe() as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                if principal.due() and not await principal.revalidate():
+                    return  # токен истёк или пользователь отключён — клиент переподключится с новым
+                try:
+                    event = await asyncio.wait_for(queue.get(), principal.wait_timeout())
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"  # чтобы прокси не закрывали простаивающее соединение
+                    continue
+                if _event_visible(principal.user, event, only):
+                    data = json.dumps(_public_event(event))
+                    yield f"event: status\nid: {event['version']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events/ws")
+async def file_events_ws(websocket: WebSocket, access_token: Optional[str] = Query(None)):
+    """
+    То же, что /files/events, по WebSocket. Клиент может прислать {"ids": [...]},
+    чтобы следить только за своими файлами ({"ids": null} — снова все доступные).
+    """
+    async with async_session_maker() as db:
+        try:
+            user = await authenticate_token(access_token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await websocket.accept()
+    principal = _StreamPrincipal(access_token, user)
+
+    only: Optional[set[int]] = None
+
+    async def read_filters() -> None:
+        nonlocal only
+        while True:
+            try:
+                msg = await websocket.receive_json()
+                ids = msg.get("ids") if isinstance(msg, dict) else None
+                only = {int(i) for i in ids} if ids else None
+            except WebSocketDisconnect:
+                return
+            except (TypeError, ValueError):
+                # не JSON или ids не список чисел — протокол нарушен, закрываем
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+
+    # читатель завершится на отключении клиента — тогда выходим и мы
+    reader = asyncio.create_task(read_filters())
+    try:
+        async with get_file_events().subscribe() as queue:
+            while not reader.done():
+                if principal.due() and not await principal.revalidate():
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                    return
+                # ждём событие или завершения читателя (отключение/нарушение протокола)
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {getter, reader}, timeout=principal.wait_timeout(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                event = getter.result()
+                if _event_visible(principal.user, event, only) and not reader.done():
+                    await websocket.send_json(_public_event(event))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+
+
 @router.get("/{file_id}", response_model=FileOut)
 async def get_file_info(
+    request: Request,
     file_id: int,
+    fields: FieldSelection = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    rec = await db.scalar(select(File).where(File.id == file_id))
-    if not rec:
-        raise HTTPException(status_code=404, detail="File not found")
+    rec = await _get_live_file(db, file_id)
     _ensure_read_access(current_user, rec)
-    return FileOut(
-        id=rec.id,
-        filename_original=rec.filename_original,
-        visibility=rec.visibility.value,
-        status=rec.status.value,
-        size_bytes=rec.size_bytes,
-        mime_type=rec.mime_type,
-        ext=rec.ext,
-        download_count=rec.download_count,
-        metadata=rec.meta,
+
+    # версия строки меняется при любом UPDATE (триггер), в т.ч. из Celery-задачи
+    etag = _etag(file_id, rec.version, *fields.names)
+    if (not_modified := _not_modified(request, etag)) is not None:
+        return not_modified
+    return ORJSONResponse(
+        fields.pick(rec),
+        headers={"ETag": etag, "Cache-Control": _REVALIDATE},
+    )
+
+
+def _content_etag(rec: FileRecord) -> str:
+    # объект под s3_key никогда не перезаписывается, поэтому ключ однозначно задаёт содержимое
+    return _etag(rec.s3_key)
+
+
+async def _count_download(db: AsyncSession, file_id: int) -> None:
+    try:
+        await incr_download(file_id)
+    except RedisError:
+        # Redis недоступен — атомарный инкремент прямо в БД, без read-modify-write
+        await db.execute(update(File).where(File.id == file_id).values(download_count=File.download_count + 1))
+        await db.commit()
+        # триггер сменил version — кэш записи и ETag карточки должны это увидеть
+        await invalidate_file_records([file_id])
+
+
+async def _proxy_download(request: Request, db: AsyncSession, rec: FileRecord) -> Response:
+    """
+    Потоковая отдача объекта через API (для клиентов без доступа к MinIO):
+    Range/If-Range для перемотки в просмотрщиках, If-None-Match -> 304.
+    Память на загрузку — один кусок DOWNLOAD_PROXY_CHUNK_KB, скорость задаёт клиент.
+    """
+    etag = _content_etag(rec)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        # отдаём с origin API: браузер не должен угадывать тип по содержимому
+        "X-Content-Type-Options": "nosniff",
+    }
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = rec.size_bytes
+    byte_range = None
+    if if_range(request.headers.get("if-range"), etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    # докачки и перемотки не считаем отдельными скачиваниями
+    if byte_range is None or byte_range[0] == 0:
+        await _count_download(db, rec.id)
+
+    s3 = get_async_s3()
+    start, end = byte_range if byte_range else (None, None)
+    try:
+        body = await s3.open_body(rec.s3_key, start, end)
+    except Exception:
+        raise HTTPException(status_code=502, detail="Storage unavailable")
+    # соединение с БД на время отдачи потока не держим
+    await db.close()
+
+    headers["Content-Disposition"] = content_disposition(rec.filename_original)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        status_code = 206
+    else:
+        headers["Content-Length"] = str(size)
+        status_code = 200
+    return StreamingResponse(
+        s3.iter_body(body, settings.DOWNLOAD_PROXY_CHUNK_KB * 1024),
+        status_code=status_code,
+        # rec.mime_type — заголовок клиента при загрузке, ему не доверяем
+        media_type=serve_mime(rec.ext),
+        headers=headers,
     )
 
 
 @router.get("/{file_id}/download")
 async def download_file(
+    request: Request,
     file_id: int,
+    proxy: bool = Query(settings.DOWNLOAD_PROXY, description="Отдать содержимое через API вместо редиректа в S3"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    rec = await db.scalar(select(File).where(File.id == file_id))
-    if not rec:
-        raise HTTPException(status_code=404, detail="File not found")
+    rec = await _get_live_file(db, file_id)
     _ensure_read_access(current_user, rec)
 
-    await db.execute(update(File).where(File.id == file_id).values(download_count=rec.download_count + 1))
-    await db.commit()
-
-    url = S3Client().generate_presigned_url(rec.s3_key, expires_seconds=60)
-    return RedirectResponse(url=url, status_code=307)
+    if not proxy:
+        await _count_download(db, file_id)
+        # подписанная ссылка из кэша; браузер может переиспользовать сам редирект, пока она жива
+        url, max_age = presigned_download_url(get_async_s3(), rec.s3_key, rec.visibility)
+        return RedirectResponse(url=url, status_code=307, headers={"Cache-Control": f"private, max-age={max_age}"})
+    return await _proxy_download(request, db, rec)
 
 
-@router.get("/", response_model=Page[FileOut])
+@router.get("/", responses={200: {"model": Page[FileOut]}})
 async def list_files(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    q: Optional[str] = Query(None, description="Поиск по имени файла"),
-    visibility: Optional[VisibilityIn] = Query(None),
-    owner_id: Optional[int] = Query(None),
-    department_id: Optional[int] = Query(None),
-    ext: Optional[str] = Query(None, description="Расширение без точки, напр. pdf"),
+    filters: FileFilters = Depends(),
+    fields: FieldSelection = Depends(),
+    params: Params = Depends(),
     order: str = Query("desc", pattern="^(asc|desc)$"),  # для Pydantic v2 используем pattern
+    sort: str = Query("id", pattern="^(id|relevance)$", description="relevance — по близости имени к q"),
 ):
-    query = select(File)
-    vf = _visibility_filter(current_user)
-    if vf is not True:
-        query = query.where(vf)
-
-    if q:
-        query = query.where(File.filename_original.ilike(f"%{q}%"))
-    if visibility:
-        query = query.where(File.visibility == Visibility(visibility.value))
-    if owner_id:
-        query = query.where(File.owner_id == owner_id)
-    if ext:
-        query = query.where(File.ext.ilike(ext.lower()))
-    if department_id is not None:
-        if current_user.role in (UserRole.ADMIN, UserRole.MANAGER):
-            query = query.where(File.department_id == department_id)
-        else:
-            query = query.where(File.department_id == current_user.department_id)
-
-    query = query.order_by(File.id.asc() if order == "asc" else File.id.desc())
-    rows = (await db.scalars(query)).all()
-
-    items = [
-        FileOut(
-            id=r.id,
-            filename_original=r.filename_original,
-            visibility=r.visibility.value,
-            status=r.status.value,
-            size_bytes=r.size_bytes,
-            mime_type=r.mime_type,
-            ext=r.ext,
-            download_count=r.download_count,
-            metadata=r.meta,  # <-- фикс: meta, не metadata
-        )
-        for r in rows
-    ]
-    return paginate(items)
+    # Версия выборки — count + sum(version) по тем же фильтрам: версии строк только растут,
+    # поэтому любое изменение, появление или исчезновение строки меняет пару. max(version)
+    # не годится: nextval выдаётся при UPDATE, а не при commit, и транзакция с меньшей
+    # версией может закоммититься позже — max не изменится. count заодно нужен для Page.total
+    total, version_sum = (
+        await db.execute(filters.apply(select(func.count(), func.sum(File.version)), current_user))
+    ).one()
+    etag = _scope_etag(request, current_user, total, version_sum)
+    if (not_modified := _not_modified(request, etag)) is not None:
+        return not_modified
+
+    # limit/offset выполняются в БД, в память попадает только текущая страница
+    query = filters.apply(select(*fields.columns()), current_user)
+    id_order = File.id.asc() if order == "asc" else File.id.desc()
+    if sort == "relevance" and filters.q:
+        query = query.order_by(func.word_similarity(filters.q, File.filename_original).desc(), id_order)
+    else:
+        query = query.order_by(id_order)
+    return await _lean_page(db, query, params, total, headers={"ETag": etag, "Cache-Control": _REVALIDATE})
 
 
 @router.delete("/{file_id}", status_code=204)
@@ -220,18 +1085,59 @@ async def delete_file(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    rec = await db.scalar(select(File).where(File.id == file_id))
-    if not rec:
-        raise HTTPException(status_code=404, detail="File not found")
+    rec = await _get_live_file(db, file_id)
 
     _ensure_delete_access(current_user, rec)
 
-    # удаление из S3 и БД
-    try:
-        S3Client().delete_object(rec.s3_key)
-    except Exception:
-        pass
-
-    await db.execute(delete(File).where(File.id == file_id))
+    # только tombstone; строку и объект S3 уберёт purge_deleted_files
+    res = await db.execute(
+        update(File).where(File.id == file_id, File.deleted_at.is_(None)).values(deleted_at=func.now())
+    )
     await db.commit()
+    await invalidate_file_records([file_id])
+    if res.rowcount == 0:
+        raise HTTPException(status_code=404, detail="File not found")  # кэш отстал: уже удалён
     return
+
+
+@router.post("/delete", response_model=BulkDeleteResponse)
+async def delete_files(
+    body: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Удаление пачки файлов: права проверяются по каждой строке, tombstone — одним UPDATE."""
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > settings.BULK_DELETE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_DELETE_MAX_FILES} files per request")
+
+    rows = (
+        await db.execute(
+            select(File.id, File.owner_id, File.department_id)
+            .where(File.id.in_(ids), File.deleted_at.is_(None))
+        )
+    ).all()
+    found = {row.id for row in rows}
+    allowed, forbidden = [], []
+    for row in rows:
+        try:
+            _ensure_delete_access(current_user, row)
+            allowed.append(row)
+        except HTTPException:
+            forbidden.append(row.id)
+
+    if allowed:
+        # строки и объекты S3 (DeleteObjects по 1000 ключей) уберёт purge_deleted_files
+        await db.execute(
+            update(File)
+            .where(File.id.in_([row.id for row in allowed]), File.deleted_at.is_(None))
+            .values(deleted_at=func.now())
+        )
+    await db.commit()
+    await invalidate_file_records([row.id for row in allowed])
+
+    return BulkDeleteResponse(
+        deleted=[row.id for row in allowed],
+        forbidden=forbidden,
+        not_found=[i for i in ids if i not in found],
+    )
@@ -4,11 +4,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.core.deps import get_db, get_current_user, require_manager_or_admin, require_admin
-from app.core.security import hash_password
+from app.core.principal_cache import invalidate_principal
+from app.core.security import hash_password_async
 from app.db.models.user import User
 from app.db.models.department import Department
 from app.db.models.enums import UserRole
-from app.schemas.user import UserOut, CreateUserRequest, UpdateRoleRequest
+from app.schemas.user import UserOut, CreateUserRequest, UpdateActiveRequest, UpdateRoleRequest
 
 router = APIRouter()
 
@@ -54,7 +55,7 @@ async def create_user(
 
     u = User(
         email=data.email,
-        password_hash=hash_password(data.password),
+        password_hash=await hash_password_async(data.password),
         role=role,
         department_id=department_id,
     )
@@ -113,10 +114,40 @@ async def change_role(
         update(User).where(User.id == user_id).values(role=new_role)
     )
     await db.commit()
+    await invalidate_principal(user_id)
     # вернуть обновлённого
     u = await db.scalar(select(User).where(User.id == user_id))
     return _user_to_out(u)
 
+@router.put("/{user_id}/active", response_model=UserOut, summary="Активация/деактивация пользователя (MANAGER/ADMIN)")
+async def set_active(
+    user_id: int,
+    payload: UpdateActiveRequest,
+    db: AsyncSession = Depends(get_db),
+    me: User = Depends(require_manager_or_admin),
+):
+    u = await db.scalar(select(User).where(User.id == user_id))
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Те же ограничения, что и при смене роли
+    if me.role == UserRole.MANAGER:
+        if u.department_id != me.department_id:
+            raise HTTPException(status_code=403, detail="Forbidden: other department")
+        if u.role == UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Manager cannot modify ADMIN user")
+    if u.id == me.id and not payload.is_active:
+        raise HTTPException(status_code=400, detail="Cannot deactivate yourself")
+
+    await db.execute(
+        update(User).where(User.id == user_id).values(is_active=payload.is_active)
+    )
+    await db.commit()
+    # деактивированный пользователь не должен проходить по закэшированному снимку
+    await invalidate_principal(user_id)
+    u = await db.scalar(select(User).where(User.id == user_id))
+    return _user_to_out(u)
+
 @router.get("/", response_model=List[UserOut], summary="Список пользователей отдела (MANAGER/ADMIN)")
 async def list_users(
     db: AsyncSession = Depends(get_db),
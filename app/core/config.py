@@ -3,15 +3,36 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     # DB
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    # Пул каждого процесса Celery-воркера (одна задача за раз — много соединений не нужно)
+    WORKER_DB_POOL_SIZE: int = 2
 
     # JWT
     JWT_SECRET: str
     JWT_ALG: str = "HS256"
     JWT_EXPIRES_MIN: int = 60
 
+    # bcrypt в отдельном пуле: 0 = по числу ядер; сверх очереди — 503
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE: int = 64
+
+    # Кэш аутентифицированных пользователей (снимок User по id + декодированные токены)
+    PRINCIPAL_CACHE_TTL: float = 30.0  # локальный кэш процесса; он же предел устаревания между воркерами
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_REDIS: bool = False  # общий второй уровень в Redis (REDIS_CACHE)
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300
+
     # Redis / Celery
     REDIS_BROKER: str = "redis://redis:6379/0"
     REDIS_BACKEND: str = "redis://redis:6379/1"
+    # Redis для счётчиков/кэшей API (отдельная БД от брокера)
+    REDIS_CACHE: str = "redis://redis:6379/2"
+    REDIS_MAX_CONNECTIONS: int = 64
+
+    # Счётчики скачиваний копятся в Redis и сбрасываются в Postgres пачкой
+    DOWNLOAD_COUNTER_FLUSH_SECONDS: float = 10.0
 
     # MinIO / S3
     MINIO_ENDPOINT: str = "minio:9000"
@@ -21,6 +42,85 @@ class Settings(BaseSettings):
     S3_REGION: str = "us-east-1"
     S3_USE_SSL: bool = False
     S3_PUBLIC_ENDPOINT: str = "http://minio:9000"
+    # Размер части multipart-загрузки (S3 требует >= 5MB для всех частей, кроме последней)
+    S3_MULTIPART_CHUNK_MB: int = 8
+    # Пул соединений общего клиента и потоков под блокирующие вызовы boto3
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_CONNECT_TIMEOUT: int = 5
+    S3_READ_TIMEOUT: int = 60
+    # Ranged-чтение объектов (парсинг метаданных без полной загрузки)
+    S3_RANGE_BLOCK_KB: int = 256
+    S3_RANGE_CACHE_BLOCKS: int = 64
+
+    # Upload
+    # Прямая загрузка в MinIO по presigned POST: срок жизни формы и upload-токена
+    PRESIGNED_UPLOAD_EXPIRES: int = 900
+    # Возобновляемые загрузки: сколько живёт сессия без активности (сек)
+    UPLOAD_SESSION_TTL: int = 24 * 3600
+    # Как часто прерывать multipart-загрузки без живой сессии (брошенные/истёкшие)
+    MULTIPART_GC_INTERVAL_SECONDS: float = 3600.0
+    # Пакетная загрузка: файлов в запросе и одновременных потоков в S3
+    UPLOAD_BATCH_MAX_FILES: int = 100
+    UPLOAD_BATCH_CONCURRENCY: int = 4
+    # Пакетное удаление: файлов в одном запросе
+    BULK_DELETE_MAX_FILES: int = 1000
+
+    # Сборщик сирот в бакете: объекты без files.s3_key/blobs.s3_key.
+    # Грейс-период больше срока жизни сессий загрузки: объект multipart-загрузки
+    # датирован её началом, а строка File появляется только после complete.
+    ORPHAN_GC_INTERVAL_SECONDS: float = 3600.0
+    ORPHAN_GC_GRACE_SECONDS: int = 26 * 3600
+    ORPHAN_GC_MAX_DELETES: int = 5000  # за один проход
+    ORPHAN_GC_MAX_PAGES: int = 50  # страниц листинга (по 1000 ключей) за один проход
+    ORPHAN_GC_PAGE_PAUSE: float = 0.2  # пауза между страницами, сек
+
+    # Мягкое удаление: tombstone-ы старше задержки purge удаляет пачками
+    PURGE_INTERVAL_SECONDS: float = 60.0
+    PURGE_DELAY_SECONDS: int = 300
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_MAX_BATCHES: int = 20  # за один запуск
+
+    # Скачивание: по умолчанию 307 на presigned URL; proxy — поток через API
+    DOWNLOAD_PROXY: bool = False
+    DOWNLOAD_PROXY_CHUNK_KB: int = 256
+
+    # ZIP-архив файлов: лимит файлов и окно упреждающего чтения из S3
+    # (память ~ ARCHIVE_PREFETCH_FILES * ARCHIVE_PREFETCH_CHUNKS * DOWNLOAD_PROXY_CHUNK_KB)
+    ARCHIVE_MAX_FILES: int = 1000
+    ARCHIVE_PREFETCH_FILES: int = 4
+    ARCHIVE_PREFETCH_CHUNKS: int = 4
+
+    # События статуса файлов (SSE/WebSocket): очередь на подключение и интервал keep-alive
+    FILE_EVENTS_QUEUE: int = 256
+    FILE_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Кэш записей files (read-through): Redis + короткий L1 в процессе
+    FILE_CACHE_TTL: int = 300
+    FILE_CACHE_MISSING_TTL: int = 10
+    FILE_CACHE_LOCK_MS: int = 2000  # сколько ждать чужой загрузки холодного ключа
+    FILE_CACHE_LOCAL_TTL: float = 2.0
+    FILE_CACHE_LOCAL_SIZE: int = 10000
+
+    # Presigned URL для скачивания: срок жизни по видимости файла и кэш подписанных ссылок
+    PRESIGN_EXPIRES_PRIVATE: int = 60
+    PRESIGN_EXPIRES_DEPARTMENT: int = 300
+    PRESIGN_EXPIRES_PUBLIC: int = 3600
+    PRESIGN_CACHE_SIZE: int = 10000
+    PRESIGN_CLOCK_SKEW_SECONDS: int = 5  # запас в max-age редиректа на расхождение часов
+
+    # Дедупликация по SHA-256: одинаковое содержимое хранится и парсится один раз
+    STORAGE_DEDUP: bool = False
+    UPLOAD_SNIFF_BYTES: int = 8192  # сколько первых байт отдаём libmagic
+
+    # Метаданные небольших файлов извлекаются прямо при загрузке (0 — всегда через Celery)
+    INLINE_METADATA_MAX_BYTES: int = 1024 * 1024
+    INLINE_METADATA_WORKERS: int = 2  # процессы пула парсинга
+    INLINE_METADATA_QUEUE: int = 8
+    INLINE_METADATA_TIMEOUT: float = 5.0
+
+    # Полнотекстовый поиск по содержимому документов
+    FTS_CONFIG: str = "simple"  # конфигурация to_tsvector (simple — без стемминга, годится для ru/en)
+    FTS_MAX_TEXT_CHARS: int = 200_000  # сколько текста документа индексируем
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,30 +1,65 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.session import get_db
 
 from app.db.models.user import User
-from app.core.security import decode_access_token
+from app.core.principal_cache import (
+    decode_token_cached,
+    get_principal,
+    principal_from_snapshot,
+    principal_generation,
+    snapshot,
+    store_principal,
+)
 from app.db.models.enums import UserRole
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
-async def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    if not creds:
+async def authenticate_token(token: Optional[str], db: AsyncSession) -> User:
+    if not token:
         raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
     try:
-        payload = decode_access_token(creds.credentials)
+        payload = decode_token_cached(token)
+        # токены другого назначения (например, upload) для входа не годятся
+        if payload.get("typ", "access") != "access":
+            raise ValueError("not an access token")
         user_id = int(payload["sub"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
-    user = await db.scalar(select(User).where(User.id == user_id))
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
-    return user
+    # Снимок пользователя из кэша; в БД идём только при промахе
+    snap = await get_principal(user_id)
+    if snap is None:
+        generation = await principal_generation(user_id)
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
+        snap = snapshot(user)
+        await store_principal(snap, generation)
+    if not snap["is_active"]:
+        raise HTTPException(status_code=401, detail="User is inactive", headers={"WWW-Authenticate": "Bearer"})
+    return principal_from_snapshot(snap)
+
+async def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    return await authenticate_token(creds.credentials if creds else None, db)
+
+def get_stream_token(
+    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    access_token: Optional[str] = Query(None, description="Для EventSource/WebSocket, которые не умеют слать Authorization"),
+) -> Optional[str]:
+    return creds.credentials if creds else access_token
+
+async def get_stream_user(
+    token: Optional[str] = Depends(get_stream_token),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    return await authenticate_token(token, db)
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != UserRole.ADMIN:
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.db.models.enums import UserRole
+from app.db.models.user import User
+from app.services.cache_gen import bump_gen, read_gen, set_if_gen
+from app.services.redis_client import get_redis
+from app.utils.ttl_cache import TTLCache
+
+_tokens = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+_principals = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+# растёт на каждой инвалидации в процессе: снимок, загруженный раньше, в L1 не пишем
+_epoch = 0
+
+
+def _redis_key(user_id: int) -> str:
+    return f"filesvc:principal:{user_id}"
+
+
+def decode_token_cached(token: str) -> Dict[str, Any]:
+    """decode_access_token с кэшем; запись живёт не дольше срока действия токена."""
+    payload = _tokens.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        ttl = min(settings.PRINCIPAL_CACHE_TTL, payload.get("exp", 0) - time.time())
+        _tokens.set(token, payload, ttl)
+    return payload
+
+
+def snapshot(user: User) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role.value,
+        "department_id": user.department_id,
+        "is_active": user.is_active,
+    }
+
+
+def principal_from_snapshot(snap: Dict[str, Any]) -> User:
+    # Отсоединённый экземпляр User: хэндлерам нужны только его поля
+    return User(
+        id=snap["id"],
+        email=snap["email"],
+        role=UserRole(snap["role"]),
+        department_id=snap["department_id"],
+        is_active=snap["is_active"],
+    )
+
+
+async def get_principal(user_id: int) -> Optional[Dict[str, Any]]:
+    snap = _principals.get(user_id)
+    if snap is not None or not settings.PRINCIPAL_CACHE_REDIS:
+        return snap
+    epoch = _epoch
+    try:
+        raw = await get_redis().get(_redis_key(user_id))
+    except RedisError:
+        return None
+    if raw is None:
+        return None
+    snap = json.loads(raw)
+    if epoch == _epoch:
+        _principals.set(user_id, snap)
+    return snap
+
+
+async def principal_generation(user_id: int) -> Tuple[int, Optional[str]]:
+    """Брать до загрузки User из БД и передавать в store_principal."""
+    gen = None
+    if settings.PRINCIPAL_CACHE_REDIS:
+        try:
+            gen = await read_gen(get_redis(), _redis_key(user_id))
+        except RedisError:
+            pass
+    return _epoch, gen
+
+
+async def store_principal(snap: Dict[str, Any], generation: Tuple[int, Optional[str]]) -> None:
+    # Снимок кладём, только если с начала загрузки не было invalidate_principal:
+    # иначе запрос, прочитавший User до деактивации, вернул бы его в кэш
+    epoch, gen = generation
+    if settings.PRINCIPAL_CACHE_REDIS:
+        if gen is None:
+            return  # поколение не прочитали (Redis недоступен) — не кэшируем
+        try:
+            stored = await set_if_gen(
+                get_redis(), _redis_key(snap["id"]), gen, json.dumps(snap), settings.PRINCIPAL_CACHE_REDIS_TTL
+            )
+        except RedisError:
+            return
+        if not stored:
+            return
+    if epoch == _epoch:
+        _principals.set(snap["id"], snap)
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """
+    Вызывать после изменения роли/отдела/активности пользователя.
+    Локальные кэши других процессов устаревают не дольше PRINCIPAL_CACHE_TTL.
+    """
+    global _epoch
+    _epoch += 1
+    _principals.pop(user_id)
+    if settings.PRINCIPAL_CACHE_REDIS:
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                bump_gen(pipe, _redis_key(user_id))
+                await pipe.execute()
+        except RedisError:
+            pass
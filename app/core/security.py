@@ -3,19 +3,44 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional
 
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.utils.executor import BoundedExecutor, ExecutorBusy
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt отпускает GIL, поэтому потоков достаточно, чтобы масштабироваться по ядрам
+_hash_executor = BoundedExecutor(
+    "pwd-hash", settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE
+)
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+async def _run_hashing(fn, *args):
+    try:
+        return await _hash_executor.run(fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests",
+            headers={"Retry-After": "1"},
+        )
+
+async def hash_password_async(password: str) -> str:
+    """hash_password вне event loop (ограниченный пул, 503 при переполнении)."""
+    return await _run_hashing(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """verify_password вне event loop (ограниченный пул, 503 при переполнении)."""
+    return await _run_hashing(verify_password, plain, hashed)
+
 def create_access_token(
     sub: str,
     data: Optional[Dict[str, Any]] = None,
@@ -0,0 +1,20 @@
+from typing import Optional
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy import String, Enum, Integer
+from app.db.base import Base
+from app.db.models.enums import FileStatus
+
+class Blob(Base):
+    """Содержимое файла в S3 (content-addressed): одно на все File с тем же SHA-256."""
+    __tablename__ = "blobs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), unique=True)
+    s3_key: Mapped[str] = mapped_column(String(512), unique=True)
+    size_bytes: Mapped[int] = mapped_column(Integer)
+    refcount: Mapped[int] = mapped_column(Integer, default=1)
+
+    # извлечённые метаданные переиспользуются всеми File этого blob
+    status: Mapped[FileStatus] = mapped_column(Enum(FileStatus, name="filestatus"), default=FileStatus.PENDING)
+    meta: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
+    content_tsv: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
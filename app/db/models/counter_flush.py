@@ -0,0 +1,10 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, func
+from app.db.base import Base
+
+class CounterFlush(Base):
+    """Применённые снимки счётчиков скачиваний: повторный сброс того же снимка пропускается."""
+    __tablename__ = "counter_flushes"
+    flush_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
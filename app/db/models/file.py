@@ -1,17 +1,37 @@
+from datetime import datetime
+from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import String, Enum, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy import BigInteger, DateTime, String, Enum, ForeignKey, Integer, Index, text
 from app.db.base import Base
 from app.db.models.enums import Visibility, FileStatus
+from app.db.models import blob  # noqa: F401  (таблица blobs для FK files.blob_id)
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # ILIKE '%q%' по имени файла и ранжирование по similarity (миграция 0003)
+        Index(
+            "ix_files_filename_trgm",
+            "filename_original",
+            postgresql_using="gin",
+            postgresql_ops={"filename_original": "gin_trgm_ops"},
+        ),
+        Index("ix_files_ext_lower", text("lower(ext)")),
+        Index("ix_files_content_tsv", "content_tsv", postgresql_using="gin"),
+        # мягкое удаление: живые строки для чтения, tombstone-ы для purge (миграция 0006)
+        Index("ix_files_live", "id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_files_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     department_id: Mapped[int] = mapped_column(ForeignKey("departments.id"), index=True)
 
     filename_original: Mapped[str] = mapped_column(String(255))
-    s3_key: Mapped[str] = mapped_column(String(512), unique=True)
+    s3_key: Mapped[str] = mapped_column(String(512), index=True)
+    # content-addressed хранение (STORAGE_DEDUP): общий blob для одинакового содержимого
+    blob_id: Mapped[Optional[int]] = mapped_column(ForeignKey("blobs.id"), nullable=True, index=True)
     mime_type: Mapped[str] = mapped_column(String(100))
     ext: Mapped[str] = mapped_column(String(10))
     size_bytes: Mapped[int] = mapped_column(Integer)
@@ -20,5 +40,14 @@ class File(Base):
     status: Mapped[FileStatus] = mapped_column(Enum(FileStatus,name="filestatus"), default=FileStatus.PENDING, index=True)
     meta: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
     download_count: Mapped[int] = mapped_column(Integer, default=0)
+    # текст документа для полнотекстового поиска; deferred — списки его не грузят
+    content_tsv: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    # tombstone: файл удалён пользователем, строку и объект S3 позже убирает purge
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # версия строки для ETag: берётся из files_version_seq при INSERT и при каждом UPDATE
+    # (триггер files_bump_version, миграция 0007)
+    version: Mapped[int] = mapped_column(
+        BigInteger, server_default=text("nextval('files_version_seq')"), index=True
+    )
 
     owner = relationship("User")
@@ -1,12 +1,29 @@
 # app/db/session.py
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True, echo=False)
 
-# <-- это то, что импортирует Celery-задача
-async_session_maker = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+def make_engine(pool_size: int = settings.DB_POOL_SIZE, max_overflow: int = settings.DB_MAX_OVERFLOW) -> AsyncEngine:
+    return create_async_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        future=True,
+        echo=False,
+    )
+
+
+def make_session_maker(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=bind, expire_on_commit=False, class_=AsyncSession)
+
+
+engine = make_engine()
+
+# сессии API; Celery-задачи берут свою фабрику из app.tasks.runtime
+async_session_maker = make_session_maker(engine)
 
 # совместимость (если где-то используешь старое имя)
 AsyncSessionLocal = async_session_maker
@@ -1,12 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 from app.api.routers.auth import router as auth_router
 from app.api.routers.files import router as files_router
 from app.api.routers.users import router as users_router 
+from app.services.file_cache import listen_file_invalidations
 from fastapi.security import OAuth2PasswordBearer
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-app = FastAPI(title="File Storage Service", version="0.2.0")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # L1-кэш записей files сбрасывается по инвалидациям из других процессов и Celery
+    listener = asyncio.create_task(listen_file_invalidations())
+    yield
+    listener.cancel()
+
+
+app = FastAPI(title="File Storage Service", version="0.2.0", lifespan=lifespan)
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(files_router, prefix="/files", tags=["files"])
 app.include_router(users_router,prefix="/users", tags=["users"] )
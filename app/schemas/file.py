@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Optional
 from enum import Enum
 
 class VisibilityIn(str, Enum):
@@ -19,3 +20,56 @@ class FileOut(BaseModel):
 
 class UploadResponse(BaseModel):
     file: FileOut
+
+class BatchUploadItem(BaseModel):
+    filename: str
+    ok: bool
+    file: Optional[FileOut] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    items: list[BatchUploadItem]
+
+class FileCursorPage(BaseModel):
+    items: list[FileOut]
+    next_cursor: Optional[int] = None
+
+class PresignUploadRequest(BaseModel):
+    filename: str
+    size: int
+    visibility: VisibilityIn = VisibilityIn.private
+
+class PresignUploadResponse(BaseModel):
+    url: str
+    fields: dict[str, str]
+    upload_token: str
+    expires_in: int
+
+class FinalizeUploadRequest(BaseModel):
+    upload_token: str
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+    visibility: VisibilityIn = VisibilityIn.private
+
+class UploadSessionOut(BaseModel):
+    session_id: str
+    size: int
+    part_size: int
+    parts_total: int
+    offset: int  # байт подряд с начала файла
+    received_parts: list[int]
+    missing_parts: list[int]
+
+class UploadPartOut(BaseModel):
+    part_number: int
+    etag: str
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int]
+
+class BulkDeleteResponse(BaseModel):
+    deleted: list[int]
+    forbidden: list[int]
+    not_found: list[int]
@@ -17,3 +17,6 @@ class CreateUserRequest(BaseModel):
 
 class UpdateRoleRequest(BaseModel):
     role: str  # "USER" | "MANAGER" | "ADMIN"
+
+class UpdateActiveRequest(BaseModel):
+    is_active: bool
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import Integer, column, delete, literal_column, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.blob import Blob
+from app.db.models.enums import FileStatus
+
+
+@dataclass
+class AcquiredBlob:
+    id: int
+    s3_key: str
+    status: FileStatus
+    meta: dict
+    created: bool  # True — blob создан этой загрузкой, объект под её s3_key
+
+
+async def blob_exists(db: AsyncSession, sha256: str) -> bool:
+    return await db.scalar(select(Blob.id).where(Blob.sha256 == sha256)) is not None
+
+
+async def acquire_blob(db: AsyncSession, sha256: str, s3_key: str, size: int) -> AcquiredBlob:
+    """
+    Найти blob по хэшу и взять ссылку (refcount + 1) или создать новый с нашим s3_key.
+    Один атомарный INSERT ... ON CONFLICT: строка blob блокируется до commit,
+    поэтому параллельное удаление не может убрать объект у нас из-под ног.
+    """
+    stmt = (
+        pg_insert(Blob)
+        .values(sha256=sha256, s3_key=s3_key, size_bytes=size, refcount=1, status=FileStatus.PENDING, meta={})
+        .on_conflict_do_update(index_elements=[Blob.sha256], set_={"refcount": Blob.refcount + 1})
+        .returning(Blob.id, Blob.s3_key, Blob.status, Blob.meta, literal_column("xmax = 0").label("created"))
+    )
+    row = (await db.execute(stmt)).one()
+    return AcquiredBlob(id=row.id, s3_key=row.s3_key, status=row.status, meta=row.meta, created=row.created)
+
+
+async def acquire_blobs(db: AsyncSession, items: list[tuple[str, str, int]]) -> dict[str, AcquiredBlob]:
+    """
+    acquire_blob для пачки (sha256, s3_key, size) одним INSERT ... ON CONFLICT.
+    Повторы хэша внутри пачки схлопываются: refcount растёт на их число, новый blob
+    получает s3_key первого из них. Строки идут в порядке хэша — параллельные пачки
+    блокируют blob-ы в одном порядке и не ловят взаимную блокировку.
+    """
+    grouped: dict[str, tuple[str, int, int]] = {}
+    for sha256, s3_key, size in items:
+        key, size0, n = grouped.get(sha256, (s3_key, size, 0))
+        grouped[sha256] = (key, size0, n + 1)
+    if not grouped:
+        return {}
+    stmt = pg_insert(Blob).values([
+        dict(sha256=sha256, s3_key=key, size_bytes=size, refcount=n, status=FileStatus.PENDING, meta={})
+        for sha256, (key, size, n) in sorted(grouped.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256], set_={"refcount": Blob.refcount + stmt.excluded.refcount}
+    ).returning(Blob.id, Blob.sha256, Blob.s3_key, Blob.status, Blob.meta, literal_column("xmax = 0").label("created"))
+    return {
+        row.sha256: AcquiredBlob(id=row.id, s3_key=row.s3_key, status=row.status, meta=row.meta, created=row.created)
+        for row in (await db.execute(stmt)).all()
+    }
+
+
+async def release_blobs(db: AsyncSession, blob_ids: Iterable[int]) -> list[str]:
+    """
+    Снять ссылки удалённых File (blob_id может повторяться). Blob-ы с refcount 0
+    удаляются; возвращаются их s3_key — удалять объекты из S3 после commit.
+    Вызывать после удаления строк files (FK).
+    """
+    counts = Counter(blob_ids)
+    if not counts:
+        return []
+    v = values(column("id", Integer), column("n", Integer), name="v").data(list(counts.items()))
+    await db.execute(update(Blob).where(Blob.id == v.c.id).values(refcount=Blob.refcount - v.c.n))
+    res = await db.execute(
+        delete(Blob).where(Blob.id.in_(list(counts)), Blob.refcount <= 0).returning(Blob.s3_key)
+    )
+    return list(res.scalars())
+
+
+async def object_keys_to_delete(db: AsyncSession, rows: Iterable[tuple[str, Optional[int]]]) -> list[str]:
+    """
+    По (s3_key, blob_id) удалённых File вернуть объекты S3, которые больше никому не нужны:
+    ключи файлов без blob и ключи blob-ов, у которых закончились ссылки.
+    """
+    keys: list[str] = []
+    blob_ids: list[int] = []
+    for s3_key, blob_id in rows:
+        if blob_id is None:
+            keys.append(s3_key)
+        else:
+            blob_ids.append(blob_id)
+    keys.extend(await release_blobs(db, blob_ids))
+    return keys
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+# Поколение ключа кэша: инвалидация увеличивает его, а read-through записывает
+# загруженное из БД значение, только если поколение не менялось с начала загрузки.
+# Иначе медленный загрузчик вернул бы в кэш снимок, прочитанный до инвалидации.
+
+_GEN_TTL = 24 * 3600  # заведомо дольше любой загрузки из БД
+
+_SET_IF_GEN = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _gen_key(key: str) -> str:
+    return f"{key}:gen"
+
+
+async def read_gen(r, key: str) -> str:
+    """Читать до запроса в БД."""
+    return await r.get(_gen_key(key)) or "0"
+
+
+async def set_if_gen(r, key: str, gen: str, value: str, ex: int) -> bool:
+    return bool(await r.eval(_SET_IF_GEN, 2, key, _gen_key(key), gen, value, ex))
+
+
+def bump_gen(pipe, key: str) -> None:
+    """Добавляет в pipeline (sync или async) инвалидацию ключа: новое поколение + удаление значения."""
+    pipe.incr(_gen_key(key))
+    pipe.expire(_gen_key(key), _GEN_TTL)
+    pipe.delete(key)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Optional
+from uuid import uuid4
+
+import redis
+
+from app.services.redis_client import get_redis
+
+DOWNLOADS_KEY = "filesvc:downloads"
+# Снимок, который сейчас сбрасывается в БД; переживает падение воркера до DEL
+DOWNLOADS_FLUSHING_KEY = "filesvc:downloads:flushing"
+# id снимка flushing: записывается в БД в той же транзакции, что и UPDATE счётчиков
+DOWNLOADS_FLUSH_ID_KEY = "filesvc:downloads:flushing:id"
+FLUSH_LOCK_KEY = "filesvc:downloads:flush-lock"
+
+# снимок убирает только тот, кто его применил: устаревший сбросчик не сотрёт следующий
+_ACK = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+
+async def incr_download(file_id: int) -> None:
+    # HINCRBY атомарен: ни гонок read-modify-write, ни записи в Postgres на каждое скачивание
+    await get_redis().hincrby(DOWNLOADS_KEY, str(file_id), 1)
+
+
+def take_download_deltas(r: redis.Redis) -> tuple[Optional[str], dict[int, int]]:
+    """
+    Забирает накопленные дельты: (id снимка, {file_id: delta}). Если предыдущий сброс
+    не завершился (ключ flushing остался), повторно отдаёт тот же снимок с тем же id —
+    по id в БД видно, был ли он уже применён.
+    После записи в БД нужно вызвать ack_download_deltas.
+    """
+    if not r.exists(DOWNLOADS_FLUSHING_KEY):
+        try:
+            r.rename(DOWNLOADS_KEY, DOWNLOADS_FLUSHING_KEY)
+        except redis.ResponseError:
+            return None, {}  # нечего сбрасывать: ключа нет
+    r.set(DOWNLOADS_FLUSH_ID_KEY, uuid4().hex, nx=True)
+    flush_id = r.get(DOWNLOADS_FLUSH_ID_KEY)
+    raw = r.hgetall(DOWNLOADS_FLUSHING_KEY)
+    return flush_id, {int(k): int(v) for k, v in raw.items() if int(v)}
+
+
+def ack_download_deltas(r: redis.Redis, flush_id: str) -> None:
+    r.eval(_ACK, 2, DOWNLOADS_FLUSHING_KEY, DOWNLOADS_FLUSH_ID_KEY, flush_id)
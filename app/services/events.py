@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from typing import Any, AsyncIterator, Optional
+
+import redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.db.models.enums import Visibility
+from app.services.file_cache import drop_local_records
+from app.services.redis_client import get_redis
+
+FILE_EVENTS_CHANNEL = "filesvc:file-events"
+
+
+def publish_file_events(r: redis.Redis, events: list[dict[str, Any]]) -> None:
+    """Из Celery: смена статуса файлов. Best-effort — клиенты без событий просто переспросят."""
+    if not events:
+        return
+    try:
+        with r.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.publish(FILE_EVENTS_CHANNEL, json.dumps(event))
+            pipe.execute()
+    except RedisError:
+        pass
+
+
+_EVENT_FIELDS = {"file_id": int, "status": str, "owner_id": int, "department_id": int, "visibility": str, "version": int}
+
+
+def _parse_event(raw: Any) -> Optional[dict[str, Any]]:
+    # Подписчики обращаются к полям напрямую: пропускаем дальше только событие нужной формы
+    try:
+        event = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict):
+        return None
+    for name, kind in _EVENT_FIELDS.items():
+        if not isinstance(event.get(name), kind) or isinstance(event.get(name), bool):
+            return None
+    if event["visibility"] not in Visibility.__members__:
+        return None
+    return event
+
+
+class FileEventBroadcaster:
+    """
+    Одна подписка на Redis pub/sub на процесс API, раздача событий по локальным
+    очередям подключений (SSE/WebSocket). Очереди ограничены: медленный клиент
+    теряет события, а не копит память.
+    """
+
+    def __init__(self, queue_size: int):
+        self._queue_size = queue_size
+        self._queues: set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(FILE_EVENTS_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        event = _parse_event(message.get("data"))
+                        if event is None:
+                            continue  # битое сообщение не должно останавливать раздачу
+                        # клиент, получивший READY, сразу читает файл — L1 этого процесса
+                        # сбрасываем раньше, чем дойдёт сообщение из канала инвалидаций
+                        drop_local_records([event["file_id"]])
+                        for queue in self._queues:
+                            if not queue.full():
+                                queue.put_nowait(event)
+                finally:
+                    await pubsub.reset()
+            except (RedisError, OSError):
+                await asyncio.sleep(1)  # переподключаемся
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        self._queues.add(queue)
+        try:
+            yield queue
+        finally:
+            self._queues.discard(queue)
+
+
+_broadcaster: Optional[FileEventBroadcaster] = None
+
+
+def get_file_events() -> FileEventBroadcaster:
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = FileEventBroadcaster(settings.FILE_EVENTS_QUEUE)
+    return _broadcaster
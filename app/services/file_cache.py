@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+import redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models.enums import FileStatus, Visibility
+from app.db.models.file import File
+from app.services.cache_gen import bump_gen, read_gen, set_if_gen
+from app.services.redis_client import get_redis
+from app.utils.ttl_cache import TTLCache
+
+_KEY = "filesvc:file:{}"
+# id инвалидированных записей: процессы API сбрасывают их из своего L1
+INVALIDATE_CHANNEL = "filesvc:file-invalidate"
+_LOCK_KEY = "filesvc:file:{}:lock"
+_MISSING = "null"  # в Redis и в L1: файла нет (или он удалён)
+_RETRY = object()  # результат для ожидающих, если загрузка не удалась
+
+
+@dataclass
+class FileRecord:
+    """Снимок живой строки files для чтения/скачивания/проверки прав (без ORM)."""
+
+    id: int
+    owner_id: int
+    department_id: int
+    filename_original: str
+    s3_key: str
+    blob_id: Optional[int]
+    mime_type: str
+    ext: str
+    size_bytes: int
+    visibility: Visibility
+    status: FileStatus
+    meta: dict
+    download_count: int
+    version: int
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))  # str-enum-ы сериализуются значениями
+
+    @classmethod
+    def loads(cls, raw: str) -> Optional["FileRecord"]:
+        data = json.loads(raw)
+        if data is None:
+            return None
+        data["visibility"] = Visibility(data["visibility"])
+        data["status"] = FileStatus(data["status"])
+        return cls(**data)
+
+
+_COLUMNS = [getattr(File, name) for name in FileRecord.__dataclass_fields__]
+
+# L1 в процессе: горячие файлы не ходят даже в Redis. Инвалидации из других процессов
+# и из Celery приходят через INVALIDATE_CHANNEL; короткий TTL — страховка, если сообщение потерялось
+_local = TTLCache(settings.FILE_CACHE_LOCAL_SIZE, settings.FILE_CACHE_LOCAL_TTL)
+_inflight: dict[int, asyncio.Future] = {}
+# растёт на каждой инвалидации в процессе: загрузка, начатая раньше, в L1 не пишет
+_epoch = 0
+
+
+async def _select(db: AsyncSession, file_id: int) -> Optional[FileRecord]:
+    row = (await db.execute(select(*_COLUMNS).where(File.id == file_id, File.deleted_at.is_(None)))).first()
+    return FileRecord(**row._asdict()) if row is not None else None
+
+
+async def _wait_for_fill(r, key: str) -> Optional[str]:
+    # Кто-то уже грузит этот ключ из БД — ждём его результат, а не идём в БД сами
+    deadline = asyncio.get_running_loop().time() + settings.FILE_CACHE_LOCK_MS / 1000
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+        raw = await r.get(key)
+        if raw is not None:
+            return raw
+    return None
+
+
+async def _load(db: AsyncSession, file_id: int) -> tuple[Optional[FileRecord], bool]:
+    # (запись, можно ли класть в L1): False, если запись инвалидировали, пока мы читали БД
+    r = get_redis()
+    key, lock_key = _KEY.format(file_id), _LOCK_KEY.format(file_id)
+    locked = False
+    try:
+        raw = await r.get(key)
+        if raw is None:
+            locked = bool(await r.set(lock_key, "1", nx=True, px=settings.FILE_CACHE_LOCK_MS))
+            if not locked:
+                raw = await _wait_for_fill(r, key)
+        if raw is not None:
+            return FileRecord.loads(raw), True
+        gen = await read_gen(r, key)
+    except RedisError:
+        return await _select(db, file_id), False  # Redis недоступен — работаем напрямую с БД
+
+    rec = await _select(db, file_id)
+    fresh = False
+    try:
+        if rec is not None:
+            fresh = await set_if_gen(r, key, gen, rec.dumps(), settings.FILE_CACHE_TTL)
+        else:
+            fresh = await set_if_gen(r, key, gen, _MISSING, settings.FILE_CACHE_MISSING_TTL)
+        if locked:
+            await r.delete(lock_key)
+    except RedisError:
+        pass
+    return rec, fresh
+
+
+async def get_file_record(db: AsyncSession, file_id: int) -> Optional[FileRecord]:
+    """
+    Read-through: L1 -> Redis -> БД. Холодный ключ грузится из БД один раз:
+    в процессе — общий Future, между процессами — Redis-блокировка на время загрузки.
+    """
+    cached = _local.get(file_id)
+    if cached is not None:
+        return cached if cached is not _MISSING else None
+
+    pending = _inflight.get(file_id)
+    if pending is not None:
+        rec = await asyncio.shield(pending)
+        if rec is not _RETRY:
+            return rec
+        # у загружавшего запроса ошибка/отмена — грузим сами
+
+    epoch = _epoch
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[file_id] = fut
+    try:
+        rec, fresh = await _load(db, file_id)
+    except BaseException:
+        fut.set_result(_RETRY)
+        raise
+    finally:
+        _inflight.pop(file_id, None)
+    fut.set_result(rec)
+    if fresh and epoch == _epoch:
+        _local.set(file_id, rec if rec is not None else _MISSING)
+    return rec
+
+
+def drop_local_records(file_ids: Iterable[int]) -> None:
+    global _epoch
+    _epoch += 1
+    for file_id in file_ids:
+        _local.pop(file_id)
+
+
+async def listen_file_invalidations() -> None:
+    """Фоновая задача процесса API: сброс L1 по инвалидациям из других процессов и Celery."""
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            try:
+                async for message in pubsub.listen():
+                    try:
+                        ids = [int(i) for i in json.loads(message["data"])]
+                    except (TypeError, ValueError):
+                        continue
+                    drop_local_records(ids)
+            finally:
+                await pubsub.reset()
+        except (RedisError, OSError):
+            _local.clear()  # пока не подписаны, инвалидации теряются
+            await asyncio.sleep(1)
+
+
+async def invalidate_file_records(file_ids: Iterable[int]) -> None:
+    """После commit любой записи в files (загрузка, удаление, смена статуса/видимости)."""
+    ids = list(file_ids)
+    drop_local_records(ids)
+    if not ids:
+        return
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for file_id in ids:
+                bump_gen(pipe, _KEY.format(file_id))
+            pipe.publish(INVALIDATE_CHANNEL, json.dumps(ids))
+            await pipe.execute()
+    except RedisError:
+        pass  # запись истечёт по FILE_CACHE_TTL
+
+
+def invalidate_file_records_sync(r: redis.Redis, file_ids: Iterable[int]) -> None:
+    # Для Celery-задач: L1 процессов API сбрасывается через INVALIDATE_CHANNEL
+    ids = list(file_ids)
+    if not ids:
+        return
+    try:
+        with r.pipeline(transaction=False) as pipe:
+            for file_id in ids:
+                bump_gen(pipe, _KEY.format(file_id))
+            pipe.publish(INVALIDATE_CHANNEL, json.dumps(ids))
+            pipe.execute()
+    except RedisError:
+        pass
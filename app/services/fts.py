@@ -0,0 +1,14 @@
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.core.config import settings
+
+
+def fts_vector(text: str):
+    """SQL-выражение tsvector для files.content_tsv."""
+    return func.to_tsvector(cast(settings.FTS_CONFIG, REGCONFIG), text)
+
+
+def fts_query(q: str):
+    # websearch-синтаксис: слова, "фразы", -исключения, or
+    return func.websearch_to_tsquery(cast(settings.FTS_CONFIG, REGCONFIG), q)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models.blob import Blob
+from app.db.models.enums import FileStatus, Visibility
+from app.db.models.file import File
+from app.db.models.user import User
+from app.services.blobs import acquire_blob, acquire_blobs
+from app.services.fts import fts_vector
+from app.services.inline_metadata import try_extract_inline
+from app.services.storage_s3 import AsyncS3Client
+from app.services.upload_stream import StreamedUpload
+
+
+def split_ext(filename: str) -> str:
+    return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+
+def new_object_key(owner: User, ext: str) -> str:
+    key_tail = f"{uuid4()}.{ext}" if ext else str(uuid4())
+    return f"{owner.department_id}/{owner.id}/{key_tail}"
+
+
+def staging_key(final_key: str) -> str:
+    # Прямая загрузка из браузера идёт сюда: presigned POST действует весь свой срок,
+    # поэтому клиент может перезаписать staging-объект и после finalize, но не final_key
+    return f"staging/{final_key}"
+
+
+async def register_upload(
+    db: AsyncSession,
+    s3: AsyncS3Client,
+    *,
+    owner: User,
+    filename: str,
+    ext: str,
+    mime: str,
+    visibility: Visibility,
+    s3_key: str,
+    uploaded: StreamedUpload,
+) -> tuple[File, bool, list[str]]:
+    """
+    Создаёт (db.add, без commit) File для уже загруженного содержимого.
+    Возвращает (File, нужна ли Celery-задача извлечения метаданных,
+    лишние объекты S3 — удалить после commit).
+
+    В режиме STORAGE_DEDUP файл привязывается к blob по SHA-256: для известного
+    содержимого готовые метаданные берутся из blob, а наш лишний объект не нужен.
+    Строка blob блокируется от acquire_blob до commit, поэтому парсинг и обращения
+    к S3 делаются до неё (или после commit), а под блокировкой — только SQL.
+    """
+    rec = File(
+        owner_id=owner.id,
+        department_id=owner.department_id,
+        filename_original=filename,
+        s3_key=s3_key,
+        mime_type=mime,
+        ext=ext,
+        size_bytes=uploaded.size,
+        visibility=visibility,
+        status=FileStatus.PENDING,
+        meta={},  # важно: meta, не metadata
+    )
+
+    # Небольшие файлы уже в памяти: извлекаем метаданные сразу, без повторного скачивания воркером.
+    # Содержимое, которое проверка перед загрузкой уже нашла в blob-ах, не парсим
+    inline = None
+    if uploaded.body is not None and uploaded.stored:
+        inline = await try_extract_inline(ext, uploaded.body)
+
+    redundant: list[str] = []
+    if settings.STORAGE_DEDUP and uploaded.sha256:
+        blob = await acquire_blob(db, uploaded.sha256, s3_key, uploaded.size)
+        rec.blob_id = blob.id
+        rec.s3_key = blob.s3_key
+        if blob.created:
+            if not uploaded.stored:
+                # редкая гонка: проверка перед загрузкой видела blob, но он успел удалиться.
+                # Записываем под блокировкой — blob без объекта нельзя коммитить
+                await s3.put_object(s3_key, uploaded.body)
+        else:
+            if uploaded.stored:
+                redundant.append(s3_key)
+            if blob.status != FileStatus.PENDING:
+                rec.status = blob.status
+                rec.meta = blob.meta
+                rec.content_tsv = select(Blob.content_tsv).where(Blob.id == blob.id).scalar_subquery()
+                db.add(rec)
+                return rec, False, redundant
+
+    if inline is not None:
+        rec.status, rec.meta, text = inline
+        if rec.status == FileStatus.READY:
+            rec.content_tsv = fts_vector(text)
+        if rec.blob_id is not None:
+            await db.execute(
+                update(Blob).where(Blob.id == rec.blob_id).values(
+                    status=rec.status,
+                    meta=rec.meta,
+                    content_tsv=fts_vector(text) if rec.status == FileStatus.READY else None,
+                )
+            )
+    db.add(rec)
+    return rec, inline is None, redundant
+
+
+@dataclass
+class ReceivedUpload:
+    """Файл, уже записанный в S3 и проверенный, но ещё без строки files."""
+
+    filename: str
+    ext: str
+    mime: str
+    visibility: Visibility
+    s3_key: str
+    uploaded: StreamedUpload
+    # (status, meta, text), если метаданные извлечены сразу после загрузки (тело уже отпущено)
+    inline: Optional[tuple[FileStatus, dict[str, Any], str]] = None
+
+
+async def register_uploads(
+    db: AsyncSession, owner: User, items: list[ReceivedUpload]
+) -> tuple[list[File], list[str]]:
+    """
+    Пакетный вариант register_upload (без commit): blob-ы — одним INSERT ... ON CONFLICT,
+    строки files — одним многострочным INSERT с заранее выделенными id.
+    Возвращает (File в порядке items, лишние объекты S3 — удалить после commit).
+    Метаданные items уже извлечены (inline) или будут извлечены Celery (status PENDING).
+    """
+    ids = list((await db.scalars(
+        select(func.nextval(func.pg_get_serial_sequence("files", "id"))).select_from(func.generate_series(1, len(items)))
+    )).all())
+
+    blobs = {}
+    if settings.STORAGE_DEDUP:
+        blobs = await acquire_blobs(
+            db, [(it.uploaded.sha256, it.s3_key, it.uploaded.size) for it in items if it.uploaded.sha256]
+        )
+
+    rows: list[dict[str, Any]] = []
+    records: list[File] = []
+    redundant: list[str] = []
+    blob_updates: dict[int, tuple[FileStatus, dict[str, Any], str]] = {}
+    for file_id, it in zip(ids, items):
+        row: dict[str, Any] = {
+            "id": file_id,
+            "owner_id": owner.id,
+            "department_id": owner.department_id,
+            "filename_original": it.filename,
+            "s3_key": it.s3_key,
+            "blob_id": None,
+            "mime_type": it.mime,
+            "ext": it.ext,
+            "size_bytes": it.uploaded.size,
+            "visibility": it.visibility,
+            "status": FileStatus.PENDING,
+            "meta": {},
+            "download_count": 0,
+            "content_tsv": None,
+        }
+        blob = blobs.get(it.uploaded.sha256) if it.uploaded.sha256 else None
+        if blob is not None:
+            row["blob_id"], row["s3_key"] = blob.id, blob.s3_key
+            if blob.s3_key != it.s3_key:
+                redundant.append(it.s3_key)  # содержимое уже хранится под ключом blob
+            if blob.status != FileStatus.PENDING:
+                row["status"], row["meta"] = blob.status, blob.meta
+                row["content_tsv"] = select(Blob.content_tsv).where(Blob.id == blob.id).scalar_subquery()
+        if row["status"] == FileStatus.PENDING and it.inline is not None:
+            status, meta, text = it.inline
+            row["status"], row["meta"] = status, meta
+            if status == FileStatus.READY:
+                row["content_tsv"] = fts_vector(text)
+            if blob is not None:
+                blob_updates.setdefault(blob.id, it.inline)
+        rows.append(row)
+        records.append(File(**{k: v for k, v in row.items() if k != "content_tsv"}))
+
+    for blob_id, (status, meta, text) in blob_updates.items():
+        await db.execute(
+            update(Blob).where(Blob.id == blob_id, Blob.status == FileStatus.PENDING).values(
+                status=status, meta=meta, content_tsv=fts_vector(text) if status == FileStatus.READY else None
+            )
+        )
+    await db.execute(insert(File).values(rows))
+    return records, redundant
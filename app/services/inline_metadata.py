@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import BrokenExecutor
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.db.models.enums import FileStatus
+from app.services.metadata import extract_document
+from app.utils.executor import BoundedExecutor, ExecutorBusy
+
+# Парсинг pypdf/zip — чистый Python и держит GIL, поэтому пул процессов, а не потоков
+_executor = BoundedExecutor(
+    "inline-meta",
+    settings.INLINE_METADATA_WORKERS,
+    settings.INLINE_METADATA_QUEUE,
+    processes=True,
+)
+
+
+async def try_extract_inline(ext: str, data: bytes) -> Optional[tuple[FileStatus, dict[str, Any], str]]:
+    """
+    (status, meta, text) для небольшого файла, извлечённые прямо в запросе загрузки.
+    None — файл велик, пул занят или не успели за таймаут: тогда работает Celery.
+    """
+    if len(data) > settings.INLINE_METADATA_MAX_BYTES:
+        return None
+    try:
+        # зависший парсер executor гасит вместе с процессами пула, а не оставляет занимать место
+        meta, text = await _executor.run(
+            extract_document, ext, data, settings.FTS_MAX_TEXT_CHARS, timeout=settings.INLINE_METADATA_TIMEOUT
+        )
+    except (ExecutorBusy, BrokenExecutor, asyncio.TimeoutError):
+        return None
+    except Exception:
+        # парсер упал на содержимом — воркер упал бы так же
+        return FileStatus.FAILED, {}, ""
+    return FileStatus.READY, meta, text
@@ -1,27 +1,45 @@
 from __future__ import annotations
-from datetime import datetime
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Union
 from pypdf import PdfReader
-from docx import Document
 from io import BytesIO
-import tempfile
-import re
-import os
-# import textract
-
-import subprocess
-
-def _run_cmd(cmd: list[str], timeout: int = 10) -> str:
-    res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-    if res.returncode != 0:
-        raise RuntimeError(f"cmd failed: {' '.join(cmd)}\n{res.stderr}")
-    return res.stdout
-
-def extract_pdf_meta(data: bytes) -> dict[str, Any]:
-    from io import BytesIO
-    reader = PdfReader(BytesIO(data))
+from xml.etree import ElementTree as ET
+import posixpath
+import zipfile
+
+import olefile
+
+from app.services import msdoc
+
+# bytes целиком или seekable-поток (например, ranged-чтение из S3)
+Source = Union[bytes, BinaryIO]
+
+def _as_stream(data: Source) -> BinaryIO:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return BytesIO(data)
+    data.seek(0)
+    return data
+
+def _collect_text(chunks, text_limit: int) -> str:
+    # Собираем текст, пока не наберём text_limit символов (дальше не парсим)
+    out: list[str] = []
+    total = 0
+    if text_limit <= 0:
+        return ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        out.append(chunk)
+        total += len(chunk) + 1
+        if total >= text_limit:
+            break
+    return "\n".join(out)[:text_limit]
+
+def extract_pdf(data: Source, text_limit: int = 0) -> tuple[dict[str, Any], str]:
+    # pypdf читает xref/trailer и объекты по требованию — с потоком это несколько Range-запросов
+    reader = PdfReader(_as_stream(data))
     info = reader.metadata or {}
-    return {
+    meta = {
         "pages": len(reader.pages),
         "author": str(info.get("/Author") or ""),
         "title": str(info.get("/Title") or ""),
@@ -29,51 +47,181 @@ def extract_pdf_meta(data: bytes) -> dict[str, Any]:
         "creator": str(info.get("/Creator") or ""),
         "producer": str(info.get("/Producer") or ""),
     }
+    text = _collect_text((page.extract_text() for page in reader.pages), text_limit)
+    return meta, text
 
-def extract_docx_meta(data: bytes) -> dict[str, Any]:
-    from io import BytesIO
-    doc = Document(BytesIO(data))
-    cp = doc.core_properties
-    return {
-        "paragraphs": sum(len(p.text) > 0 for p in doc.paragraphs),
-        "tables": len(doc.tables),
-        "title": cp.title or "",
-        "author": cp.author or "",
-        "created": str(cp.created or ""),
-    }
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
+_DCTERMS = "{http://purl.org/dc/terms/}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_REL_OFFICE_DOCUMENT = "/officeDocument"
+_REL_CORE_PROPERTIES = "/metadata/core-properties"
+
+def _docx_part_names(zf: zipfile.ZipFile) -> tuple[str, str]:
+    # Пути основного документа и core.xml из _rels/.rels (с дефолтами на случай их отсутствия)
+    document, core = "word/document.xml", "docProps/core.xml"
+    try:
+        rels = ET.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return document, core
+    for rel in rels.iter(f"{_REL}Relationship"):
+        target = posixpath.normpath(rel.get("Target", "")).lstrip("/")
+        rel_type = rel.get("Type", "")
+        if rel_type.endswith(_REL_OFFICE_DOCUMENT):
+            document = target
+        elif rel_type.endswith(_REL_CORE_PROPERTIES):
+            core = target
+    return document, core
+
+def _w3cdtf(value: str | None) -> str:
+    # как python-docx: naive datetime в UTC
+    if not value:
+        return ""
+    try:
+        dt = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return ""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return str(dt)
 
+def _w_text(el: ET.Element) -> str:
+    return "".join(t.text or "" for t in el.iter(f"{_W}t"))
 
-def extract_doc_meta(data: bytes) -> dict[str, object]:
+def extract_docx(data: Source, text_limit: int = 0) -> tuple[dict[str, Any], str]:
     """
-    Best-effort для .doc без textract:
-      - пытаемся через antiword (UTF-8)
-      - при ошибке — через catdoc (-w)
-      - считаем параграфы как блоки, таблицы — по строкам с >=2 табами
-      - title/author/created могут быть пустыми (формат древний)
+    Читаем zip напрямую, а не через python-docx (тот грузит все части, включая картинки):
+    нужны только central directory, core.xml и document.xml. Счёт как у python-docx —
+    непустые параграфы и таблицы верхнего уровня body.
     """
-    with tempfile.NamedTemporaryFile(suffix=".doc", delete=False) as tmp:
-        tmp.write(data)
-        path = tmp.name
-    try:
-        text = ""
-        try:
-            text = _run_cmd(["antiword", "-m", "UTF-8.txt", path])
-        except Exception:
-            text = _run_cmd(["catdoc", "-w", path])
-
-        blocks = [b for b in re.split(r"\n\s*\n", text) if b.strip()]
-        paragraphs = len(blocks)
-        tables = sum(1 for line in text.splitlines() if line.count("\t") >= 2)
-
-        return {
-            "paragraphs": paragraphs,
-            "tables": tables,
-            "title": "",
-            "author": "",
-            "created": "",
-        }
-    finally:
+    with zipfile.ZipFile(_as_stream(data)) as zf:
+        document_name, core_name = _docx_part_names(zf)
+
+        title = author = created = ""
         try:
-            os.remove(path)
-        except OSError:
-            pass
\ No newline at end of file
+            core = ET.fromstring(zf.read(core_name))
+            title = core.findtext(f"{_DC}title") or ""
+            author = core.findtext(f"{_DC}creator") or ""
+            created = _w3cdtf(core.findtext(f"{_DCTERMS}created"))
+        except KeyError:
+            pass
+
+        paragraphs = tables = 0
+        chunks: list[str] = []
+        collected = 0
+        depth = 0
+        with zf.open(document_name) as fh:
+            # iterparse: в памяти только текущий элемент body, а не всё дерево
+            for event, el in ET.iterparse(fh, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 2:  # прямые потомки w:body (document -> body -> *)
+                    continue
+                if el.tag == f"{_W}p":
+                    text = _w_text(el)
+                    if text:
+                        paragraphs += 1
+                        if collected < text_limit:
+                            chunks.append(text)
+                            collected += len(text) + 1
+                elif el.tag == f"{_W}tbl":
+                    tables += 1
+                    if collected < text_limit:
+                        for row in el.iter(f"{_W}tr"):
+                            line = "\t".join(_w_text(c) for c in row.findall(f"{_W}tc"))
+                            chunks.append(line)
+                            collected += len(line) + 1
+                el.clear()
+
+    meta = {
+        "paragraphs": paragraphs,
+        "tables": tables,
+        "title": title,
+        "author": author,
+        "created": created,
+    }
+    return meta, _collect_text(chunks, text_limit)
+
+
+def extract_doc(data: Source, text_limit: int = 0) -> tuple[dict[str, object], str]:
+    """
+    .doc (Word 97-2003) разбираем в процессе через olefile:
+      - title/author/created — из SummaryInformation
+      - текст — из WordDocument по piece table (см. app.services.msdoc)
+      - параграфы — непустые вне таблиц; таблицы — по подряд идущим параграфам
+        с метками ячеек (best-effort: без разбора PAPX)
+    """
+    with olefile.OleFileIO(_as_stream(data)) as ole:
+        summary = msdoc.read_summary(ole)
+        text = msdoc.read_main_text(ole)
+
+    paragraphs = tables = 0
+    in_table = False
+    chunks: list[str] = []
+    for para in text.split(msdoc.PARAGRAPH_MARK):
+        if msdoc.CELL_MARK in para:
+            if not in_table:
+                tables += 1
+                in_table = True
+            chunks.append(para.strip(msdoc.CELL_MARK).replace(msdoc.CELL_MARK, "\t"))
+            continue
+        in_table = False
+        if para.strip():
+            paragraphs += 1
+            chunks.append(para)
+
+    meta = {
+        "paragraphs": paragraphs,
+        "tables": tables,
+        **summary,
+    }
+    return meta, _collect_text(chunks, text_limit)
+
+
+def extract_pdf_meta(data: Source) -> dict[str, Any]:
+    return extract_pdf(data)[0]
+
+def extract_docx_meta(data: Source) -> dict[str, Any]:
+    return extract_docx(data)[0]
+
+def extract_doc_meta(data: Source) -> dict[str, object]:
+    return extract_doc(data)[0]
+
+
+EXTRACTORS = {
+    "pdf": extract_pdf,
+    "docx": extract_docx,
+    "doc": extract_doc,
+}
+
+# Postgres не принимает NUL ни в text, ни в jsonb; прочие управляющие символы (кроме \t\n\r)
+# в тексте документов — мусор парсеров, заменяем пробелом
+_CONTROL_CHARS = {c: " " for c in range(32) if chr(c) not in "\t\n\r"} | {0: None, 0x7F: " "}
+
+
+def clean_text(value: str) -> str:
+    return value.translate(_CONTROL_CHARS)
+
+
+def _clean_meta(value: Any) -> Any:
+    if isinstance(value, str):
+        return clean_text(value)
+    if isinstance(value, dict):
+        return {clean_text(str(k)): _clean_meta(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean_meta(v) for v in value]
+    return value
+
+
+def extract_document(ext: str, data: Source, text_limit: int = 0) -> tuple[dict[str, Any], str]:
+    """
+    Метаданные и (до text_limit символов) текст документа по расширению.
+    Единая точка для Celery и inline-извлечения: здесь же чистим то, что Postgres не примет.
+    """
+    extractor = EXTRACTORS.get(ext.lower())
+    if extractor is None:
+        return {"note": "DOC basic support (best-effort)"}, ""
+    meta, text = extractor(data, text_limit)
+    return _clean_meta(meta), clean_text(text)
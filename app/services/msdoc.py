@@ -0,0 +1,152 @@
+"""
+Минимальный разбор бинарного Word 97-2003 (.doc) поверх olefile, без antiword/catdoc.
+
+Текст основного документа собирается по таблице кусков (piece table, [MS-DOC] 2.9.38):
+FIB из потока WordDocument -> fcClx/lcbClx -> Clx в потоке 0Table/1Table -> PlcPcd.
+"""
+from __future__ import annotations
+
+import re
+import struct
+from datetime import datetime
+from typing import Optional
+
+import olefile
+
+_WORD_IDENT = 0xA5EC
+_NFIB_WORD97 = 0x00C0  # всё, что раньше (Word 6/95), не поддерживаем
+_F_WHICH_TBL_STM = 0x0200
+_F_ENCRYPTED = 0x0100
+_FIB_BASE_SIZE = 32
+_CCP_TEXT_INDEX = 3  # FibRgLw97.ccpText
+_FC_CLX_INDEX = 33  # FibRgFcLcb97.fcClx
+
+# Управляющие символы потока текста ([MS-DOC] 2.8.25)
+PARAGRAPH_MARK = "\r"
+CELL_MARK = "\x07"
+_FIELD_BEGIN, _FIELD_SEP, _FIELD_END = "\x13", "\x14", "\x15"
+_SPECIAL = re.compile(r"[\x00-\x06\x08\x0e-\x12\x16-\x1f]")
+
+
+class UnsupportedDocError(ValueError):
+    pass
+
+
+def _fib(word: bytes) -> tuple[str, int, int, int]:
+    """(имя table-потока, ccpText, fcClx, lcbClx) из FIB."""
+    if len(word) < _FIB_BASE_SIZE + 2:
+        raise UnsupportedDocError("WordDocument stream is too short")
+    ident, nfib = struct.unpack_from("<HH", word, 0)
+    if ident != _WORD_IDENT:
+        raise UnsupportedDocError("not a Word binary document")
+    if nfib < _NFIB_WORD97:
+        raise UnsupportedDocError(f"unsupported Word version (nFib={nfib:#x})")
+    (flags,) = struct.unpack_from("<H", word, 0x0A)
+    if flags & _F_ENCRYPTED:
+        raise UnsupportedDocError("encrypted document")
+    table = "1Table" if flags & _F_WHICH_TBL_STM else "0Table"
+
+    pos = _FIB_BASE_SIZE
+    (csw,) = struct.unpack_from("<H", word, pos)
+    pos += 2 + csw * 2
+    (cslw,) = struct.unpack_from("<H", word, pos)
+    lw_start = pos + 2
+    pos = lw_start + cslw * 4
+    (cb_fc_lcb,) = struct.unpack_from("<H", word, pos)
+    fc_start = pos + 2
+    if cslw <= _CCP_TEXT_INDEX or cb_fc_lcb <= _FC_CLX_INDEX:
+        raise UnsupportedDocError("truncated FIB")
+
+    (ccp_text,) = struct.unpack_from("<i", word, lw_start + _CCP_TEXT_INDEX * 4)
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, fc_start + _FC_CLX_INDEX * 8)
+    return table, ccp_text, fc_clx, lcb_clx
+
+
+def _piece_table(clx: bytes) -> tuple[list[int], list[int]]:
+    """CP-границы и FcCompressed всех кусков из Clx (Prc пропускаем)."""
+    pos = 0
+    while pos < len(clx) and clx[pos] == 0x01:  # Prc: clxt + cbGrpprl + grpprl
+        (cb,) = struct.unpack_from("<h", clx, pos + 1)
+        pos += 3 + cb
+    if pos >= len(clx) or clx[pos] != 0x02:
+        raise UnsupportedDocError("piece table not found")
+    (lcb,) = struct.unpack_from("<I", clx, pos + 1)
+    plc = clx[pos + 5: pos + 5 + lcb]
+    n = (lcb - 4) // 12
+    cps = list(struct.unpack_from(f"<{n + 1}I", plc, 0))
+    fcs = [struct.unpack_from("<I", plc, 4 * (n + 1) + 8 * i + 2)[0] for i in range(n)]
+    return cps, fcs
+
+
+def _strip_fields(text: str) -> str:
+    # Код поля (между 0x13 и 0x14) выкидываем, результат (между 0x14 и 0x15) оставляем
+    out: list[str] = []
+    stack: list[bool] = []  # для каждого открытого поля: показываем ли сейчас символы
+    for ch in text:
+        if ch == _FIELD_BEGIN:
+            stack.append(False)
+        elif ch == _FIELD_SEP and stack:
+            stack[-1] = True
+        elif ch == _FIELD_END and stack:
+            stack.pop()
+        elif all(stack):
+            out.append(ch)
+    return "".join(out)
+
+
+def read_main_text(ole: olefile.OleFileIO) -> str:
+    """
+    Текст основного документа (без колонтитулов/сносок) с управляющими
+    символами \\r (конец параграфа) и \\x07 (конец ячейки/строки таблицы).
+    """
+    if not ole.exists("WordDocument"):
+        raise UnsupportedDocError("WordDocument stream not found")
+    word = ole.openstream("WordDocument").read()
+    table_name, ccp_text, fc_clx, lcb_clx = _fib(word)
+    if not ole.exists(table_name):
+        raise UnsupportedDocError(f"{table_name} stream not found")
+    table = ole.openstream(table_name).read()
+    cps, fcs = _piece_table(table[fc_clx: fc_clx + lcb_clx])
+
+    parts: list[str] = []
+    for i, fc_value in enumerate(fcs):
+        cp_start, cp_end = cps[i], min(cps[i + 1], ccp_text)
+        if cp_start >= ccp_text:
+            break
+        count = cp_end - cp_start
+        if fc_value & 0x40000000:
+            # сжатый кусок: 8-битный текст cp1252 со смещением fc/2
+            fc = (fc_value & 0x3FFFFFFF) // 2
+            parts.append(word[fc: fc + count].decode("cp1252", errors="replace"))
+        else:
+            fc = fc_value & 0x3FFFFFFF
+            parts.append(word[fc: fc + 2 * count].decode("utf-16-le", errors="replace"))
+    text = _strip_fields("".join(parts))
+    # \x0b — перевод строки внутри параграфа, \x0c — разрыв страницы/раздела
+    text = text.replace("\x0b", "\n").replace("\x0c", PARAGRAPH_MARK)
+    return _SPECIAL.sub("", text)
+
+
+def _decode(value, codepage: Optional[int]) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        encoding = f"cp{codepage}" if codepage and codepage not in (1200, 65001) else "utf-8"
+        if codepage == 1200:
+            encoding = "utf-16-le"
+        try:
+            return value.decode(encoding, errors="replace").rstrip("\x00")
+        except LookupError:
+            return value.decode("latin-1").rstrip("\x00")
+    return str(value)
+
+
+def read_summary(ole: olefile.OleFileIO) -> dict[str, str]:
+    """title/author/created из потока \\x05SummaryInformation."""
+    meta = ole.get_metadata()
+    created = meta.create_time
+    return {
+        "title": _decode(meta.title, meta.codepage),
+        "author": _decode(meta.author, meta.codepage),
+        "created": str(created) if isinstance(created, datetime) else "",
+    }
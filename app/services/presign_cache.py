@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import time
+
+from app.core.config import settings
+from app.db.models.enums import Visibility
+from app.services.storage_s3 import AsyncS3Client
+from app.utils.ttl_cache import TTLCache
+
+_EXPIRES = {
+    Visibility.PRIVATE: settings.PRESIGN_EXPIRES_PRIVATE,
+    Visibility.DEPARTMENT: settings.PRESIGN_EXPIRES_DEPARTMENT,
+    Visibility.PUBLIC: settings.PRESIGN_EXPIRES_PUBLIC,
+}
+
+_urls = TTLCache(settings.PRESIGN_CACHE_SIZE, settings.PRESIGN_EXPIRES_PUBLIC)  # TTL задаётся на запись
+
+
+def presigned_download_url(s3: AsyncS3Client, key: str, visibility: Visibility) -> tuple[str, int]:
+    """
+    Presigned GET из кэша: (url, сколько секунд его можно кэшировать клиенту).
+
+    Время делится на корзины по step = expires / 2. URL подписывается на expires + step
+    и переиспользуется до конца своей корзины, поэтому у выданной ссылки всегда остаётся
+    не меньше expires секунд жизни, а граница (конец корзины + expires) одинакова для
+    всех запросов корзины — её и отдаём в max-age редиректа.
+
+    Время подписи — начало корзины, а не текущее: все процессы API выдают для корзины
+    один и тот же URL, и кэш перед MinIO видит его как один ресурс.
+    """
+    expires = _EXPIRES[visibility]
+    step = max(1, expires // 2)
+    now = time.time()
+    bucket = int(now // step)
+    bucket_end = (bucket + 1) * step
+
+    cache_key = (key, expires, bucket)
+    url = _urls.get(cache_key)
+    if url is None:
+        url = s3.generate_presigned_url_at(key, signed_at=bucket * step, expires_seconds=expires + step)
+        _urls.set(cache_key, url, ttl=bucket_end - now)
+    return url, max(0, int(bucket_end + expires - now) - settings.PRESIGN_CLOCK_SKEW_SECONDS)
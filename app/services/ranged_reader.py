@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import io
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.services.storage_s3 import S3Client
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable file-like поверх S3 Range-запросов с LRU-кэшем блоков.
+
+    Парсерам (pypdf, zipfile, olefile) обычно нужны хвост файла (xref/trailer,
+    central directory) и несколько объектов — качаем только эти блоки, а не
+    объект целиком. Соседние недостающие блоки забираются одним запросом.
+    """
+
+    def __init__(
+        self,
+        s3: S3Client,
+        key: str,
+        size: Optional[int] = None,
+        block_size: int = settings.S3_RANGE_BLOCK_KB * 1024,
+        max_blocks: int = settings.S3_RANGE_CACHE_BLOCKS,
+    ):
+        super().__init__()
+        self._s3 = s3
+        self._key = key
+        self._size = size if size is not None else int(s3.head_object(key)["ContentLength"])
+        self._block_size = block_size
+        self._max_blocks = max_blocks
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._pos = 0
+        # статистика для логов/отладки
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def _fetch(self, first: int, last: int) -> None:
+        start = first * self._block_size
+        end = min(self._size, (last + 1) * self._block_size) - 1
+        data = self._s3.get_range(self._key, start, end)
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        for i in range(first, last + 1):
+            off = (i - first) * self._block_size
+            self._put(i, data[off: off + self._block_size])
+
+    def _put(self, index: int, data: bytes) -> None:
+        self._blocks[index] = data
+        self._blocks.move_to_end(index)
+        while len(self._blocks) > self._max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _ensure(self, first: int, last: int) -> None:
+        # Недостающие блоки качаем непрерывными диапазонами
+        run_start = None
+        for i in range(first, last + 1):
+            if i in self._blocks:
+                self._blocks.move_to_end(i)
+                if run_start is not None:
+                    self._fetch(run_start, i - 1)
+                    run_start = None
+            elif run_start is None:
+                run_start = i
+        if run_start is not None:
+            self._fetch(run_start, last)
+
+    def readinto(self, b) -> int:
+        if self._pos >= self._size:
+            return 0
+        n = min(len(b), self._size - self._pos)
+        if n <= 0:
+            return 0
+        first = self._pos // self._block_size
+        last = (self._pos + n - 1) // self._block_size
+        # не больше, чем влезает в кэш за раз
+        last = min(last, first + self._max_blocks - 1)
+        self._ensure(first, last)
+
+        out = memoryview(b)
+        written = 0
+        while written < n:
+            index, off = divmod(self._pos, self._block_size)
+            block = self._blocks.get(index)
+            if block is None:
+                break
+            chunk = block[off: off + n - written]
+            if not chunk:
+                break
+            out[written: written + len(chunk)] = chunk
+            written += len(chunk)
+            self._pos += len(chunk)
+        return written
+
+
+def open_s3_object(s3: S3Client, key: str, size: Optional[int] = None) -> io.BufferedReader:
+    """Буферизованный seekable-поток объекта S3 (частые мелкие read() не ходят в сеть)."""
+    raw = S3RangeReader(s3, key, size)
+    return io.BufferedReader(raw, buffer_size=64 * 1024)
@@ -0,0 +1,27 @@
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+_async_client: aioredis.Redis | None = None
+_sync_client: redis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    # Один пул соединений на процесс API
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.from_url(
+            settings.REDIS_CACHE, max_connections=settings.REDIS_MAX_CONNECTIONS, decode_responses=True
+        )
+    return _async_client
+
+
+def get_sync_redis() -> redis.Redis:
+    # Для Celery-воркеров (создаётся лениво, уже после fork)
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.REDIS_CACHE, max_connections=settings.REDIS_MAX_CONNECTIONS, decode_responses=True
+        )
+    return _sync_client
@@ -1,24 +1,93 @@
+import asyncio
+import hashlib
+import hmac
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, BinaryIO, Iterable, Optional
+from urllib.parse import quote, urlsplit
+
 import boto3
 from botocore.client import Config
-from datetime import timedelta
 from app.core.config import settings
 
+# лимит S3 DeleteObjects на один запрос
+DELETE_BATCH = 1000
+
+_client_lock = threading.Lock()
+_shared_client = None
+_executor: ThreadPoolExecutor | None = None
+
+
+def _make_boto_client():
+    return boto3.client(
+        "s3",
+        endpoint_url=f"http://{settings.MINIO_ENDPOINT}" if str(settings.MINIO_ENDPOINT).startswith("minio") else settings.S3_PUBLIC_ENDPOINT,
+        aws_access_key_id=settings.MINIO_ROOT_USER,
+        aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
+        region_name=settings.S3_REGION,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.S3_CONNECT_TIMEOUT,
+            read_timeout=settings.S3_READ_TIMEOUT,
+        ),
+    )
+
+
+def get_boto_client():
+    # boto3-клиент потокобезопасен: один на процесс, создаётся лениво (уже после fork воркера)
+    global _shared_client
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = _make_boto_client()
+    return _shared_client
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Отдельный пул, чтобы S3 не выедал дефолтный threadpool anyio (UploadFile, sync-зависимости)
+    global _executor
+    if _executor is None:
+        with _client_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.S3_MAX_POOL_CONNECTIONS, thread_name_prefix="s3"
+                )
+    return _executor
+
+
 class S3Client:
-    def __init__(self):
-        self._client = boto3.client(
-            "s3",
-            endpoint_url=f"http://{settings.MINIO_ENDPOINT}" if str(settings.MINIO_ENDPOINT).startswith("minio") else settings.S3_PUBLIC_ENDPOINT,
-            aws_access_key_id=settings.MINIO_ROOT_USER,
-            aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
-            region_name=settings.S3_REGION,
-            config=Config(signature_version="s3v4"),
-        )
+    def __init__(self, client=None):
+        self._client = client or get_boto_client()
         self.bucket = settings.MINIO_BUCKET
 
     def upload_fileobj(self, key: str, fileobj):
         self._client.upload_fileobj(Fileobj=fileobj, Bucket=self.bucket, Key=key)
 
+    def put_object(self, key: str, data: bytes) -> None:
+        self._client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def create_multipart_upload(self, key: str) -> str:
+        res = self._client.create_multipart_upload(Bucket=self.bucket, Key=key)
+        return res["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes | BinaryIO) -> str:
+        res = self._client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return res["ETag"]
+
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        self._client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        self._client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
     def generate_presigned_url(self, key: str, expires_seconds: int = 60) -> str:
         return self._client.generate_presigned_url(
             "get_object",
@@ -26,6 +95,61 @@ class S3Client:
             ExpiresIn=expires_seconds,
         )
 
+    def generate_presigned_url_at(self, key: str, signed_at: int, expires_seconds: int) -> str:
+        """
+        Presigned GET (SigV4, path-style) с заданным временем подписи вместо текущего:
+        для одинаковых (key, signed_at, expires) URL совпадает во всех процессах.
+        boto3 всегда подписывает текущим временем, поэтому подпись считаем сами.
+        """
+        endpoint = urlsplit(self._client.meta.endpoint_url)
+        amz_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(signed_at))
+        scope = f"{amz_date[:8]}/{settings.S3_REGION}/s3/aws4_request"
+        path = quote(f"/{self.bucket}/{key}", safe="/-_.~")
+        query = "&".join(
+            f"{name}={quote(value, safe='-_.~')}"
+            for name, value in sorted({
+                "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+                "X-Amz-Credential": f"{settings.MINIO_ROOT_USER}/{scope}",
+                "X-Amz-Date": amz_date,
+                "X-Amz-Expires": str(expires_seconds),
+                "X-Amz-SignedHeaders": "host",
+            }.items())
+        )
+        canonical = f"GET\n{path}\n{query}\nhost:{endpoint.netloc}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = "\n".join(
+            ["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()]
+        )
+        signing_key = f"AWS4{settings.MINIO_ROOT_PASSWORD}".encode()
+        for part in (amz_date[:8], settings.S3_REGION, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{endpoint.scheme}://{endpoint.netloc}{path}?{query}&X-Amz-Signature={signature}"
+
+    def generate_presigned_post(self, key: str, fields: dict, conditions: list, expires_seconds: int) -> dict:
+        return self._client.generate_presigned_post(
+            Bucket=self.bucket, Key=key, Fields=fields, Conditions=conditions, ExpiresIn=expires_seconds
+        )
+
+    def head_object(self, key: str) -> dict:
+        return self._client.head_object(Bucket=self.bucket, Key=key)
+
+    def copy_object(self, src_key: str, dst_key: str, if_match: Optional[str] = None) -> None:
+        # серверное копирование; if_match — копировать, только если источник не изменился
+        params = {"Bucket": self.bucket, "Key": dst_key, "CopySource": {"Bucket": self.bucket, "Key": src_key}}
+        if if_match:
+            params["CopySourceIfMatch"] = if_match
+        self._client.copy_object(**params)
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        # end включительно, как в HTTP Range
+        res = self._client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")
+        return res["Body"].read()
+
+    def open_body(self, key: str, start: Optional[int] = None, end: Optional[int] = None):
+        """Потоковое тело объекта (botocore StreamingBody), опционально только [start, end]."""
+        kwargs = {"Range": f"bytes={start}-{end}"} if start is not None else {}
+        return self._client.get_object(Bucket=self.bucket, Key=key, **kwargs)["Body"]
+
     def download_to_bytes(self, key: str) -> bytes:
         buff = io.BytesIO()
         self._client.download_fileobj(self.bucket, key, buff)
@@ -34,3 +158,131 @@ class S3Client:
 
     def delete_object(self, key: str) -> None:
         self._client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_objects(self, keys: Iterable[str]) -> list[str]:
+        """
+        Пакетное удаление (DeleteObjects, до DELETE_BATCH ключей за запрос).
+        Возвращает ключи, которые удалить не удалось.
+        """
+        keys = list(keys)
+        failed: list[str] = []
+        for i in range(0, len(keys), DELETE_BATCH):
+            batch = keys[i: i + DELETE_BATCH]
+            try:
+                res = self._client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+            except Exception:
+                failed.extend(batch)
+                continue
+            failed.extend(err["Key"] for err in res.get("Errors", []))
+        return failed
+
+    def list_objects(self, start_after: str = "", page_size: int = DELETE_BATCH) -> tuple[list[dict], bool]:
+        """Одна страница листинга бакета: ([{Key, LastModified, Size}, ...], есть ли ещё)."""
+        res = self._client.list_objects_v2(Bucket=self.bucket, StartAfter=start_after, MaxKeys=page_size)
+        return res.get("Contents", []), bool(res.get("IsTruncated"))
+
+    def list_multipart_uploads(
+        self, key_marker: str = "", upload_id_marker: str = ""
+    ) -> tuple[list[dict], Optional[tuple[str, str]]]:
+        """Страница незавершённых multipart-загрузок: ([{Key, UploadId, Initiated}, ...], маркеры следующей)."""
+        params = {"Bucket": self.bucket, "MaxUploads": DELETE_BATCH}
+        if key_marker:
+            params.update(KeyMarker=key_marker, UploadIdMarker=upload_id_marker)
+        res = self._client.list_multipart_uploads(**params)
+        more = (res["NextKeyMarker"], res.get("NextUploadIdMarker", "")) if res.get("IsTruncated") else None
+        return res.get("Uploads", []), more
+
+
+class AsyncS3Client:
+    """
+    Тот же интерфейс, что у S3Client, но сетевые вызовы уходят в отдельный
+    пул потоков и не блокируют event loop. Presign — чисто локальное вычисление,
+    поэтому остаётся синхронным.
+    """
+
+    def __init__(self, sync: S3Client | None = None):
+        self._sync = sync or S3Client()
+        self.bucket = self._sync.bucket
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+    async def upload_fileobj(self, key: str, fileobj) -> None:
+        await self._run(self._sync.upload_fileobj, key, fileobj)
+
+    async def put_object(self, key: str, data: bytes) -> None:
+        await self._run(self._sync.put_object, key, data)
+
+    async def create_multipart_upload(self, key: str) -> str:
+        return await self._run(self._sync.create_multipart_upload, key)
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes | BinaryIO) -> str:
+        return await self._run(self._sync.upload_part, key, upload_id, part_number, data)
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        await self._run(self._sync.complete_multipart_upload, key, upload_id, parts)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        await self._run(self._sync.abort_multipart_upload, key, upload_id)
+
+    def generate_presigned_url(self, key: str, expires_seconds: int = 60) -> str:
+        return self._sync.generate_presigned_url(key, expires_seconds)
+
+    def generate_presigned_url_at(self, key: str, signed_at: int, expires_seconds: int) -> str:
+        return self._sync.generate_presigned_url_at(key, signed_at, expires_seconds)
+
+    def generate_presigned_post(self, key: str, fields: dict, conditions: list, expires_seconds: int) -> dict:
+        return self._sync.generate_presigned_post(key, fields, conditions, expires_seconds)
+
+    async def head_object(self, key: str) -> dict:
+        return await self._run(self._sync.head_object, key)
+
+    async def copy_object(self, src_key: str, dst_key: str, if_match: Optional[str] = None) -> None:
+        await self._run(self._sync.copy_object, src_key, dst_key, if_match)
+
+    async def get_range(self, key: str, start: int, end: int) -> bytes:
+        return await self._run(self._sync.get_range, key, start, end)
+
+    async def open_body(self, key: str, start: Optional[int] = None, end: Optional[int] = None):
+        return await self._run(self._sync.open_body, key, start, end)
+
+    async def iter_body(self, body, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Читает StreamingBody по chunk_size в пуле потоков. Следующий кусок читается,
+        только когда потребитель забрал предыдущий, — в памяти один кусок.
+        """
+        try:
+            while True:
+                chunk = await self._run(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def download_to_bytes(self, key: str) -> bytes:
+        return await self._run(self._sync.download_to_bytes, key)
+
+    async def delete_object(self, key: str) -> None:
+        await self._run(self._sync.delete_object, key)
+
+    async def delete_objects(self, keys: Iterable[str]) -> list[str]:
+        return await self._run(self._sync.delete_objects, list(keys))
+
+
+_async_client: AsyncS3Client | None = None
+
+
+def get_s3() -> S3Client:
+    return S3Client()
+
+
+def get_async_s3() -> AsyncS3Client:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncS3Client()
+    return _async_client
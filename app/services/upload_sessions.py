@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Optional
+from uuid import uuid4
+
+import redis
+
+from app.core.config import settings
+from app.services.redis_client import get_redis
+
+_SESSION_KEY = "filesvc:upload:{}"
+_PARTS_KEY = "filesvc:upload:{}:parts"
+_COMPLETE_LOCK_KEY = "filesvc:upload:{}:complete"
+# upload_id живой сессии (тот же TTL): по нему сборщик отличает брошенные multipart-загрузки
+_UPLOAD_ID_KEY = "filesvc:upload:mpu:{}"
+
+
+@dataclass
+class UploadSession:
+    """
+    Возобновляемая загрузка: одна сессия = один S3 multipart upload,
+    часть n клиента = часть n в S3 (все, кроме последней, ровно part_size байт).
+    Состояние в Redis и живёт UPLOAD_SESSION_TTL с последней активности; multipart-загрузки
+    брошенных и истёкших сессий прерывает задача abort_stale_multipart_uploads.
+    """
+
+    id: str
+    owner_id: int
+    s3_key: str
+    upload_id: str
+    filename: str
+    ext: str
+    visibility: str
+    size: int
+    part_size: int
+
+    @property
+    def parts_total(self) -> int:
+        return max(1, math.ceil(self.size / self.part_size))
+
+    def part_length(self, n: int) -> int:
+        if n < self.parts_total:
+            return self.part_size
+        return self.size - self.part_size * (self.parts_total - 1)
+
+
+async def create_session(
+    *, owner_id: int, s3_key: str, upload_id: str, filename: str, ext: str, visibility: str, size: int
+) -> UploadSession:
+    session = UploadSession(
+        id=uuid4().hex,
+        owner_id=owner_id,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        filename=filename,
+        ext=ext,
+        visibility=visibility,
+        size=size,
+        part_size=settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    )
+    await get_redis().hset(_SESSION_KEY.format(session.id), mapping=asdict(session))
+    await get_redis().expire(_SESSION_KEY.format(session.id), settings.UPLOAD_SESSION_TTL)
+    await get_redis().set(_UPLOAD_ID_KEY.format(upload_id), session.id, ex=settings.UPLOAD_SESSION_TTL)
+    return session
+
+
+async def load_session(session_id: str) -> Optional[UploadSession]:
+    raw = await get_redis().hgetall(_SESSION_KEY.format(session_id))
+    if not raw:
+        return None
+    return UploadSession(
+        id=raw["id"],
+        owner_id=int(raw["owner_id"]),
+        s3_key=raw["s3_key"],
+        upload_id=raw["upload_id"],
+        filename=raw["filename"],
+        ext=raw["ext"],
+        visibility=raw["visibility"],
+        size=int(raw["size"]),
+        part_size=int(raw["part_size"]),
+    )
+
+
+async def record_part(session: UploadSession, n: int, etag: str) -> None:
+    # HSET по номеру части: параллельные и повторные загрузки частей не мешают друг другу
+    key = _PARTS_KEY.format(session.id)
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hset(key, str(n), etag)
+        pipe.expire(key, settings.UPLOAD_SESSION_TTL)
+        pipe.expire(_SESSION_KEY.format(session.id), settings.UPLOAD_SESSION_TTL)
+        pipe.expire(_UPLOAD_ID_KEY.format(session.upload_id), settings.UPLOAD_SESSION_TTL)
+        await pipe.execute()
+
+
+async def uploaded_parts(session: UploadSession) -> dict[int, str]:
+    raw = await get_redis().hgetall(_PARTS_KEY.format(session.id))
+    return {int(n): etag for n, etag in raw.items()}
+
+
+def contiguous_offset(session: UploadSession, parts: dict[int, str]) -> int:
+    """Сколько байт с начала файла уже получено без пропусков (как Upload-Offset в tus)."""
+    offset = 0
+    for n in range(1, session.parts_total + 1):
+        if n not in parts:
+            break
+        offset += session.part_length(n)
+    return offset
+
+
+async def lock_completion(session: UploadSession) -> bool:
+    # Защита от двойного complete: второй вызов получит False
+    return bool(await get_redis().set(_COMPLETE_LOCK_KEY.format(session.id), "1", nx=True, ex=300))
+
+
+async def unlock_completion(session: UploadSession) -> None:
+    await get_redis().delete(_COMPLETE_LOCK_KEY.format(session.id))
+
+
+async def drop_session(session: UploadSession) -> None:
+    await get_redis().delete(
+        _SESSION_KEY.format(session.id),
+        _PARTS_KEY.format(session.id),
+        _COMPLETE_LOCK_KEY.format(session.id),
+        _UPLOAD_ID_KEY.format(session.upload_id),
+    )
+
+
+def live_upload_ids(r: redis.Redis, upload_ids: list[str]) -> set[str]:
+    """Для Celery: какие из multipart-загрузок ещё принадлежат живым сессиям."""
+    with r.pipeline(transaction=False) as pipe:
+        for upload_id in upload_ids:
+            pipe.exists(_UPLOAD_ID_KEY.format(upload_id))
+        alive = pipe.execute()
+    return {upload_id for upload_id, n in zip(upload_ids, alive) if n}
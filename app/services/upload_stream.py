@@ -0,0 +1,82 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.services.storage_s3 import AsyncS3Client
+
+
+@dataclass
+class StreamedUpload:
+    size: int
+    # тело целиком, если файл уместился в одну часть и не больше keep_body
+    # (или если загрузку пропустили — тогда тело всегда здесь)
+    body: Optional[bytes] = None
+    sha256: Optional[str] = None
+    # False — объект в S3 не записан, т.к. skip_if сказал, что такое содержимое уже есть
+    stored: bool = True
+
+
+async def stream_to_s3(
+    s3: AsyncS3Client,
+    key: str,
+    src: UploadFile,
+    check_size: Callable[[int], None],
+    check_head: Callable[[bytes], None],
+    keep_body: int = 0,
+    hash_content: bool = False,
+    skip_if: Optional[Callable[[str], Awaitable[bool]]] = None,
+) -> StreamedUpload:
+    """
+    Потоковая загрузка UploadFile в S3 без чтения файла целиком:
+      - читаем по одной части (S3_MULTIPART_CHUNK_MB), в памяти максимум одна часть
+      - check_head получает первые UPLOAD_SNIFF_BYTES байт до первого обращения к S3
+      - check_size вызывается по мере поступления байт и прерывает загрузку
+      - файл меньше одной части уходит обычным put_object, иначе — multipart
+    Возвращает размер и, для файлов до keep_body байт, само тело (оно и так в памяти).
+    hash_content — посчитать SHA-256 по ходу чтения; для файла в одну часть skip_if(sha256)
+    может отменить запись в S3 (содержимое уже хранится).
+    """
+    part_size = settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024
+
+    chunk = await src.read(part_size)
+    size = len(chunk)
+    check_size(size)
+    check_head(chunk[: settings.UPLOAD_SNIFF_BYTES])
+
+    digest = hashlib.sha256() if hash_content else None
+    nxt = await src.read(part_size)
+    if not nxt:
+        sha256 = None
+        if digest is not None:
+            digest.update(chunk)
+            sha256 = digest.hexdigest()
+            if skip_if is not None and await skip_if(sha256):
+                return StreamedUpload(size=size, body=chunk, sha256=sha256, stored=False)
+        await s3.put_object(key, chunk)
+        return StreamedUpload(size=size, body=chunk if size <= keep_body else None, sha256=sha256)
+
+    upload_id = await s3.create_multipart_upload(key)
+    parts: list[dict] = []
+    try:
+        while chunk:
+            part_number = len(parts) + 1
+            if digest is not None:
+                digest.update(chunk)
+            etag = await s3.upload_part(key, upload_id, part_number, chunk)
+            parts.append({"PartNumber": part_number, "ETag": etag})
+            chunk, nxt = nxt, (await src.read(part_size) if nxt else b"")
+            size += len(chunk)
+            check_size(size)
+        await s3.complete_multipart_upload(key, upload_id, parts)
+    except BaseException:
+        # не оставляем висящих частей в бакете
+        try:
+            await s3.abort_multipart_upload(key, upload_id)
+        except Exception:
+            pass
+        raise
+    return StreamedUpload(size=size, sha256=digest.hexdigest() if digest is not None else None)
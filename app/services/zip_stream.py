@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import time
+import zipfile
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+from app.services.storage_s3 import AsyncS3Client
+
+
+@dataclass
+class ZipEntry:
+    name: str
+    s3_key: str
+    size: int
+
+
+class _Sink(io.RawIOBase):
+    """Несикабельный приёмник для zipfile: всё записанное забирается через drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _prefetch(s3: AsyncS3Client, key: str, queue: asyncio.Queue, chunk_size: int) -> None:
+    # None — конец объекта, исключение — ошибка чтения (пробрасывается в генератор архива)
+    try:
+        body = await s3.open_body(key)
+        async for chunk in s3.iter_body(body, chunk_size):
+            await queue.put(chunk)
+        await queue.put(None)
+    except Exception as e:
+        await queue.put(e)
+
+
+def unique_names(names: list[str]) -> list[str]:
+    """Имена записей архива без '/' и без повторов: 'a.pdf', 'a (2).pdf', ..."""
+    seen: set[str] = set()
+    counters: dict[str, int] = {}  # с какого номера продолжать подбор для базового имени
+    out = []
+    for name in names:
+        base = name.replace("/", "_").replace("\\", "_") or "file"
+        name, n = base, counters.get(base, 1)
+        stem, dot, ext = base.rpartition(".")
+        # сгенерированное имя может совпасть с исходным ('a (2).pdf') — ищем свободное
+        while name in seen:
+            n += 1
+            name = f"{stem} ({n}).{ext}" if dot and stem else f"{base} ({n})"
+        counters[base] = n
+        seen.add(name)
+        out.append(name)
+    return out
+
+
+async def stream_zip(
+    s3: AsyncS3Client,
+    entries: list[ZipEntry],
+    window: int = settings.ARCHIVE_PREFETCH_FILES,
+    queue_chunks: int = settings.ARCHIVE_PREFETCH_CHUNKS,
+    chunk_size: int = settings.DOWNLOAD_PROXY_CHUNK_KB * 1024,
+) -> AsyncIterator[bytes]:
+    """
+    ZIP на лету из объектов S3, без временных файлов.
+    Записи ZIP_STORED (pdf/docx уже сжаты), размеры известны заранее — zipfile сам
+    включает ZIP64 для записей и central directory, когда это нужно. Следующие window
+    объектов читаются заранее, у каждого в очереди не больше queue_chunks кусков:
+    память ограничена window * queue_chunks * chunk_size независимо от размера архива.
+    """
+    sink = _Sink()
+    pending: deque[tuple[ZipEntry, asyncio.Queue, asyncio.Task]] = deque()
+    current: Optional[asyncio.Task] = None
+    upcoming = iter(entries)
+
+    def schedule() -> None:
+        while len(pending) < window:
+            entry: Optional[ZipEntry] = next(upcoming, None)
+            if entry is None:
+                return
+            queue: asyncio.Queue = asyncio.Queue(maxsize=queue_chunks)
+            task = asyncio.create_task(_prefetch(s3, entry.s3_key, queue, chunk_size))
+            pending.append((entry, queue, task))
+
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            schedule()
+            while pending:
+                entry, queue, current = pending.popleft()
+                schedule()
+                info = zipfile.ZipInfo(entry.name, date_time=time.localtime()[:6])
+                info.file_size = entry.size
+                with zf.open(info, mode="w") as dst:
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        dst.write(item)
+                        if data := sink.drain():
+                            yield data
+                if data := sink.drain():
+                    yield data
+        yield sink.drain()  # data descriptor последней записи и central directory
+    finally:
+        # клиент отключился или ошибка — не оставляем фоновых чтений
+        if current is not None:
+            current.cancel()
+        for _, _, task in pending:
+            task.cancel()
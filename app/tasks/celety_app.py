@@ -18,6 +18,28 @@ celery.conf.update(
 
 # 1) автопоиск задач в пакете app.tasks
 celery.autodiscover_tasks(["app.tasks"])
+# модули задач, которые воркер/beat импортируют явно
+celery.conf.imports = ("app.tasks.metadata", "app.tasks.counters", "app.tasks.gc", "app.tasks.purge")
+
+# 2) периодические задачи (celery beat)
+celery.conf.beat_schedule = {
+    "flush-download-counters": {
+        "task": "flush_download_counters",
+        "schedule": settings.DOWNLOAD_COUNTER_FLUSH_SECONDS,
+    },
+    "gc-orphan-objects": {
+        "task": "gc_orphan_objects",
+        "schedule": settings.ORPHAN_GC_INTERVAL_SECONDS,
+    },
+    "abort-stale-multipart-uploads": {
+        "task": "abort_stale_multipart_uploads",
+        "schedule": settings.MULTIPART_GC_INTERVAL_SECONDS,
+    },
+    "purge-deleted-files": {
+        "task": "purge_deleted_files",
+        "schedule": settings.PURGE_INTERVAL_SECONDS,
+    },
+}
 
 # (опционально) роутинг задач по очередям
 # celery.conf.task_routes = {
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from redis.exceptions import LockError
+from sqlalchemy import Integer, column, delete, func, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.db.models.counter_flush import CounterFlush
+from app.db.models.file import File
+from app.services.file_cache import invalidate_file_records_sync
+from app.services.counters import FLUSH_LOCK_KEY, ack_download_deltas, take_download_deltas
+from app.services.redis_client import get_sync_redis
+from app.tasks import runtime
+from app.tasks.celety_app import celery
+
+# сколько помнить id применённых снимков (снимок повторяется только до его ack)
+FLUSH_ID_RETENTION = timedelta(days=1)
+
+
+async def apply_download_deltas(session, flush_id: str, deltas: dict[int, int]) -> bool:
+    """
+    Применяет снимок ровно один раз: id снимка вставляется в той же транзакции, что и UPDATE.
+    Повтор (воркер упал между commit и ack, или второй сбросчик взял тот же снимок) — False.
+    """
+    applied = await session.scalar(
+        pg_insert(CounterFlush).values(flush_id=flush_id).on_conflict_do_nothing().returning(CounterFlush.flush_id)
+    )
+    if applied is None:
+        return False
+    # Один UPDATE ... FROM (VALUES ...) на все файлы
+    v = values(column("id", Integer), column("delta", Integer), name="v").data(list(deltas.items()))
+    await session.execute(
+        update(File).where(File.id == v.c.id).values(download_count=File.download_count + v.c.delta)
+    )
+    await session.execute(delete(CounterFlush).where(CounterFlush.applied_at < func.now() - FLUSH_ID_RETENTION))
+    return True
+
+
+async def _flush_download_counters() -> int:
+    r = get_sync_redis()
+    # Параллельные сбросы безопасны (снимок применяется один раз по id), лок лишь убирает лишнюю работу
+    lock = r.lock(FLUSH_LOCK_KEY, timeout=max(60, int(settings.DOWNLOAD_COUNTER_FLUSH_SECONDS * 6)))
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        flush_id, deltas = take_download_deltas(r)
+        if flush_id is None:
+            return 0
+        applied = False
+        if deltas:
+            async with runtime.session() as session:
+                applied = await apply_download_deltas(session, flush_id, deltas)
+                await session.commit()
+            if applied:
+                invalidate_file_records_sync(r, deltas)
+        ack_download_deltas(r, flush_id)
+        return len(deltas) if applied else 0
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            pass  # сброс дольше таймаута лока: лок истёк, возможно, его уже взял следующий
+
+
+@celery.task(name="flush_download_counters")
+def flush_download_counters_task():
+    return runtime.run(_flush_download_counters())
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, union
+
+from app.core.config import settings
+from app.db.models.blob import Blob
+from app.db.models.file import File
+from app.services.redis_client import get_sync_redis
+from app.services.storage_s3 import get_s3
+from app.services.upload_sessions import live_upload_ids
+from app.tasks import runtime
+from app.tasks.celety_app import celery
+
+GC_LOCK_KEY = "filesvc:gc:lock"
+# где остановился предыдущий проход: бакет обходится по кругу частями
+GC_CURSOR_KEY = "filesvc:gc:cursor"
+MULTIPART_GC_LOCK_KEY = "filesvc:gc:multipart:lock"
+
+
+async def _referenced(keys: list[str]) -> set[str]:
+    stmt = union(
+        select(File.s3_key).where(File.s3_key.in_(keys)),
+        select(Blob.s3_key).where(Blob.s3_key.in_(keys)),
+    )
+    async with runtime.session() as session:
+        return set((await session.execute(stmt)).scalars())
+
+
+async def _gc_orphan_objects() -> int:
+    """
+    Один ограниченный проход сверки бакета с БД: не больше ORPHAN_GC_MAX_PAGES страниц
+    листинга и ORPHAN_GC_MAX_DELETES удалений, с паузой между страницами.
+    Объекты моложе ORPHAN_GC_GRACE_SECONDS не трогаем — это могут быть незавершённые загрузки.
+    """
+    r = get_sync_redis()
+    lock = r.lock(GC_LOCK_KEY, timeout=int(settings.ORPHAN_GC_INTERVAL_SECONDS))
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        s3 = get_s3()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.ORPHAN_GC_GRACE_SECONDS)
+        cursor = r.get(GC_CURSOR_KEY) or ""
+        deleted = 0
+        for page in range(settings.ORPHAN_GC_MAX_PAGES):
+            if page:
+                await asyncio.sleep(settings.ORPHAN_GC_PAGE_PAUSE)
+            objects, more = s3.list_objects(start_after=cursor)
+            if objects:
+                cursor = objects[-1]["Key"]
+                old = [o["Key"] for o in objects if o["LastModified"] < cutoff]
+                if old:
+                    referenced = await _referenced(old)
+                    orphans = [k for k in old if k not in referenced][: settings.ORPHAN_GC_MAX_DELETES - deleted]
+                    failed = s3.delete_objects(orphans)
+                    deleted += len(orphans) - len(failed)
+            if not more:
+                cursor = ""  # дошли до конца — следующий проход начнёт сначала
+                break
+            if deleted >= settings.ORPHAN_GC_MAX_DELETES:
+                break
+        r.set(GC_CURSOR_KEY, cursor)
+        return deleted
+    finally:
+        lock.release()
+
+
+@celery.task(name="gc_orphan_objects")
+def gc_orphan_objects_task():
+    return runtime.run(_gc_orphan_objects())
+
+
+def abort_stale_multipart_uploads() -> int:
+    """
+    Прерывает multipart-загрузки без живой сессии (брошены клиентом, сессия истекла,
+    API упал между create и записью сессии): иначе их части лежат в бакете вечно
+    и не видны ни в листинге объектов, ни сборщику сирот.
+    Загрузки моложе UPLOAD_SESSION_TTL не трогаем — сессия могла ещё не записаться.
+    """
+    r = get_sync_redis()
+    lock = r.lock(MULTIPART_GC_LOCK_KEY, timeout=int(settings.MULTIPART_GC_INTERVAL_SECONDS))
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        s3 = get_s3()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        aborted = 0
+        marker = ("", "")
+        while marker is not None:
+            uploads, marker = s3.list_multipart_uploads(*marker)
+            old = [u for u in uploads if u["Initiated"] < cutoff]
+            if not old:
+                continue
+            alive = live_upload_ids(r, [u["UploadId"] for u in old])
+            for u in old:
+                if u["UploadId"] in alive:
+                    continue
+                try:
+                    s3.abort_multipart_upload(u["Key"], u["UploadId"])
+                    aborted += 1
+                except Exception:
+                    pass  # попробуем в следующий запуск
+        return aborted
+    finally:
+        lock.release()
+
+
+@celery.task(name="abort_stale_multipart_uploads")
+def abort_stale_multipart_uploads_task():
+    return abort_stale_multipart_uploads()
@@ -1,44 +1,100 @@
-import asyncio
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from celery import group
+from sqlalchemy import and_, or_, select, update
 
-from app.db.session import async_session_maker
+from app.db.models.blob import Blob
 from app.db.models.file import File
 from app.db.models.enums import FileStatus
-from app.services.storage_s3 import S3Client
-from app.services.metadata import extract_pdf_meta, extract_docx_meta,extract_doc_meta
+from app.services.ranged_reader import open_s3_object
+from app.services.storage_s3 import get_s3
+from app.core.config import settings
+from app.services.fts import fts_vector
+from app.services.events import publish_file_events
+from app.services.file_cache import invalidate_file_records_sync
+from app.services.metadata import extract_document
+from app.services.redis_client import get_sync_redis
+from app.tasks import runtime
 from app.tasks.celety_app import celery
 
 
+# что нужно подписчикам, чтобы отфильтровать событие по правам, не ходя в БД
+_EVENT_COLUMNS = (File.id, File.status, File.owner_id, File.department_id, File.visibility, File.version)
+
+
+def _publish(rows) -> None:
+    redis_client = get_sync_redis()
+    invalidate_file_records_sync(redis_client, [row.id for row in rows])
+    publish_file_events(redis_client, [
+        {
+            "file_id": r.id,
+            "status": r.status.value,
+            "owner_id": r.owner_id,
+            "department_id": r.department_id,
+            "visibility": r.visibility.value,
+            "version": r.version,
+        }
+        for r in rows
+    ])
+
+
 async def _extract_metadata_for_file(file_id: int):
-    async with async_session_maker() as session:
+    async with runtime.session() as session:
         file = await session.scalar(select(File).where(File.id == file_id))
         if not file:
             return
-        s3 = S3Client()
-        blob = s3.download_to_bytes(file.s3_key)
-        meta = {}
+
+        # Содержимое уже разобрано для другого File с тем же blob — просто копируем
+        if file.blob_id is not None:
+            blob = await session.scalar(select(Blob).where(Blob.id == file.blob_id))
+            if blob is not None and blob.status != FileStatus.PENDING:
+                res = await session.execute(
+                    update(File).where(File.id == file_id).values(
+                        meta=blob.meta,
+                        status=blob.status,
+                        content_tsv=select(Blob.content_tsv).where(Blob.id == blob.id).scalar_subquery(),
+                    ).returning(*_EVENT_COLUMNS)
+                )
+                changed = res.all()
+                await session.commit()
+                _publish(changed)
+                return
+
         try:
-            if file.ext.lower() == "pdf":
-                meta = extract_pdf_meta(blob)
-            elif file.ext.lower() == "docx":
-                meta = extract_docx_meta(blob)
-            elif file.ext.lower() == "doc":
-                meta = extract_doc_meta(blob)    
-            else:
-                meta = {"note": "DOC basic support (best-effort)"}
-            await session.execute(
-                update(File).where(File.id == file_id).values(meta=meta, status=FileStatus.READY)
-            )
-            await session.commit()
+            # pdf/docx/doc парсим поверх Range-запросов: качаются только нужные блоки объекта.
+            # Вызовы синхронные — в процессе воркера loop занят только этой задачей.
+            source = open_s3_object(get_s3(), file.s3_key, file.size_bytes)
+            with source:
+                meta, text = extract_document(file.ext, source, settings.FTS_MAX_TEXT_CHARS)
+            values = dict(meta=meta, status=FileStatus.READY, content_tsv=fts_vector(text))
         except Exception:
-            await session.execute(
-                update(File).where(File.id == file_id).values(status=FileStatus.FAILED)
-            )
-            await session.commit()
+            values = dict(status=FileStatus.FAILED)
+
+        res = await session.execute(
+            update(File).where(_same_content(file)).values(**values).returning(*_EVENT_COLUMNS)
+        )
+        changed = res.all()
+        if file.blob_id is not None:
+            await session.execute(update(Blob).where(Blob.id == file.blob_id).values(**values))
+        await session.commit()
+    _publish(changed)
+
+
+def _same_content(file: File):
+    # этот файл и ещё не разобранные файлы с тем же blob
+    if file.blob_id is None:
+        return File.id == file.id
+    return or_(File.id == file.id, and_(File.blob_id == file.blob_id, File.status == FileStatus.PENDING))
 
 
 @celery.task(name="extract_metadata")
 def extract_metadata_task(file_id: int):
-    # Оборачиваем async-функцию для выполнения в Celery
-    asyncio.run(_extract_metadata_for_file(file_id))
+    # async-функция выполняется на постоянном loop процесса воркера
+    runtime.run(_extract_metadata_for_file(file_id))
+
+
+@celery.task(name="extract_metadata_batch")
+def extract_metadata_batch_task(file_ids: list[int]):
+    # API публикует одно сообщение на пачку загрузок, а раздача по воркерам — уже здесь
+    if len(file_ids) == 1:
+        extract_metadata_task(file_ids[0])
+        return
+    group(extract_metadata_task.s(file_id) for file_id in file_ids).apply_async()
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.db.models.file import File
+from app.services.blobs import object_keys_to_delete
+from app.services.storage_s3 import get_s3
+from app.tasks import runtime
+from app.tasks.celety_app import celery
+
+
+async def _purge_batch() -> int:
+    # SKIP LOCKED: параллельные запуски берут разные пачки
+    async with runtime.session() as session:
+        rows = (
+            await session.execute(
+                select(File.id, File.s3_key, File.blob_id)
+                .where(File.deleted_at < func.now() - timedelta(seconds=settings.PURGE_DELAY_SECONDS))
+                .order_by(File.deleted_at)
+                .limit(settings.PURGE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not rows:
+            return 0
+        await session.execute(delete(File).where(File.id.in_([r.id for r in rows])))
+        keys = await object_keys_to_delete(session, [(r.s3_key, r.blob_id) for r in rows])
+        await session.commit()
+    # что не удалилось — подберёт сборщик сирот (gc_orphan_objects)
+    get_s3().delete_objects(keys)
+    return len(rows)
+
+
+async def _purge_deleted_files() -> int:
+    """Окончательно удаляет tombstone-ы: строки одним DELETE, объекты — DeleteObjects."""
+    purged = 0
+    for _ in range(settings.PURGE_MAX_BATCHES):
+        n = await _purge_batch()
+        purged += n
+        if n < settings.PURGE_BATCH_SIZE:
+            break
+    return purged
+
+
+@celery.task(name="purge_deleted_files")
+def purge_deleted_files_task():
+    return runtime.run(_purge_deleted_files())
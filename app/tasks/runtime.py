@@ -0,0 +1,74 @@
+# app/tasks/runtime.py
+"""
+Долгоживущий event loop и async-движок БД на процесс Celery-воркера.
+
+asyncio.run() на каждую задачу создаёт и закрывает loop, а пул соединений
+модульного engine при этом принадлежит уже мёртвому loop. Здесь loop и engine
+создаются один раз после fork (worker_process_init) и закрываются при остановке
+процесса. Рассчитано на prefork/solo-пулы: задачи в процессе идут по одной.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Coroutine, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.session import make_engine, make_session_maker
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_engine: AsyncEngine | None = None
+_session_maker: async_sessionmaker[AsyncSession] | None = None
+
+
+def _init() -> None:
+    global _loop, _engine, _session_maker
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _engine = make_engine(pool_size=settings.WORKER_DB_POOL_SIZE, max_overflow=0)
+    _session_maker = make_session_maker(_engine)
+
+
+def _shutdown() -> None:
+    global _loop, _engine, _session_maker
+    if _loop is None:
+        return
+    try:
+        if _engine is not None:
+            _loop.run_until_complete(_engine.dispose())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    finally:
+        _loop.close()
+        _loop = _engine = _session_maker = None
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**_: Any) -> None:
+    # Процесс только что форкнут: ничего из родителя (loop, соединения) не наследуем
+    _init()
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**_: Any) -> None:
+    _shutdown()
+
+
+def session_maker() -> async_sessionmaker[AsyncSession]:
+    if _session_maker is None:
+        _init()
+    return _session_maker
+
+
+def session() -> AsyncSession:
+    return session_maker()()
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Выполнить корутину задачи на loop процесса (замена asyncio.run)."""
+    if _loop is None:
+        _init()
+    return _loop.run_until_complete(coro)
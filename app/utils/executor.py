@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class ExecutorBusy(Exception):
+    """Очередь пула переполнена — вызывающий решает: 503 или обходной путь."""
+
+
+class BoundedExecutor:
+    """
+    Пул для CPU-тяжёлых синхронных функций, вызываемых из async-кода.
+    Одновременно выполняется не больше max_workers задач, ждут не больше max_queue;
+    всё сверх этого сразу получает ExecutorBusy вместо бесконечной очереди.
+    Место в очереди освобождается, когда задача действительно закончилась в пуле,
+    а не когда её перестали ждать (таймаут/отмена вызывающего).
+    """
+
+    def __init__(self, name: str, max_workers: int = 0, max_queue: int = 0, processes: bool = False):
+        self.name = name
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.max_queue = max_queue
+        self.processes = processes
+        self._pool: Executor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()  # done-callback вызывается из потоков пула
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.processes:
+                # spawn: не форкаем процесс с работающим event loop и потоками
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        timeout — сколько ждать результата (asyncio.TimeoutError). У пула процессов
+        задача, не уложившаяся в него, считается зависшей: процессы пула завершаются.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ExecutorBusy(self.name)
+            self._pending += 1
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            # отмена ожидания отменяет и задачу, если она ещё не началась
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            if self.processes:
+                self._recycle(pool)
+            raise
+
+    def _recycle(self, pool: Executor) -> None:
+        # Зависший парсер не отменить: гасим процессы пула (их задачи получат
+        # BrokenProcessPool и освободят места), новые задачи пойдут в свежий пул
+        if self._pool is pool:
+            self._pool = None
+        terminate = getattr(pool, "terminate_workers", None)  # Python 3.14+
+        if terminate is not None:
+            terminate()
+        else:
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
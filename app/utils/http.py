@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Optional
+from urllib.parse import quote
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Разбор заголовка Range (RFC 9110 14.2) для ресурса размера size.
+    Возвращает (start, end) включительно или None — отдать целиком
+    (нет заголовка, не bytes, несколько диапазонов, синтаксическая ошибка).
+    Бросает RangeNotSatisfiable, если диапазон за пределами файла.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last):
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if size <= 0:
+        raise RangeNotSatisfiable(header)  # у пустого ресурса нет ни одного байта
+    if start is None:
+        # суффикс: последние N байт
+        if end <= 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - end), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end is None:
+        end = size - 1
+    if start > end:
+        return None  # синтаксически неверный диапазон — игнорируем (RFC 9110 14.1.1)
+    return start, min(end, size - 1)
+
+
+def _etag_list(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True, если If-None-Match совпал (слабое сравнение) — можно отвечать 304."""
+    if not header:
+        return False
+    weak = etag.removeprefix("W/")
+    return any(tag == "*" or tag.removeprefix("W/") == weak for tag in _etag_list(header))
+
+
+def if_range(header: Optional[str], etag: str) -> bool:
+    """True, если Range можно применять: If-Range нет или совпал ETag (сильное сравнение)."""
+    if not header:
+        return True
+    # дату в If-Range не поддерживаем (Last-Modified не отдаём) — считаем несовпадением
+    return not etag.startswith("W/") and header.strip() == etag
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    # ASCII-заглушка для старых клиентов + filename* (RFC 6266/5987) для юникода
+    fallback = filename.encode("ascii", "replace").decode().replace('"', "").replace("?", "_")
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
@@ -11,6 +11,14 @@ ALLOWED_EXT_MIME = {
     "doc": {"application/msword", "application/x-msword"},
 }
 
+# Content-Type при отдаче: по проверенному расширению (сигнатура сверена при загрузке),
+# а не по заголовку клиента
+SERVE_MIME = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "doc": "application/msword",
+}
+
 def sniff_mime(data: bytes) -> str:
     return magic.from_buffer(data, mime=True)
 
@@ -18,3 +26,7 @@ def ensure_mime_matches_ext(ext: str, detected_mime: str) -> bool:
     ext = ext.lower().lstrip(".")
     allowed = ALLOWED_EXT_MIME.get(ext, set())
     return detected_mime in allowed
+
+
+def serve_mime(ext: str) -> str:
+    return SERVE_MIME.get(ext.lower().lstrip("."), "application/octet-stream")
@@ -7,10 +7,13 @@ ROLE_LIMITS = {
     "ADMIN":   {"max_mb": 100, "types": {"pdf","doc","docx"}, "can_visibility": {"PRIVATE","DEPARTMENT","PUBLIC"}},
 }
 
+def max_upload_bytes(role: str) -> int:
+    return ROLE_LIMITS[role]["max_mb"] * 1024 * 1024
+
 def ensure_upload_allowed(role: str, ext: str, size_bytes: int, requested_visibility: str) -> str:
     ext = ext.lower().lstrip(".")
     limits = ROLE_LIMITS[role]
-    max_bytes = limits["max_mb"] * 1024 * 1024
+    max_bytes = max_upload_bytes(role)
     if size_bytes > max_bytes:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Max size {limits['max_mb']}MB for role {role}")
     if ext not in limits["types"]:
@@ -0,0 +1,213 @@
+from redis.exceptions import LockError, ResponseError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.dml import Delete, Insert, Update
+
+from app.services import counters
+from app.tasks import counters as counter_tasks
+from conftest import run
+
+
+class FakeLock:
+    def __init__(self, redis, lost: bool):
+        self.redis, self.lost = redis, lost
+
+    def acquire(self, blocking=True):
+        if self.redis.locked:
+            return False
+        self.redis.locked = True
+        return True
+
+    def release(self):
+        self.redis.locked = False
+        if self.lost:
+            raise LockError("Cannot release a lock that's no longer owned")
+
+
+class FakeRedis:
+    """Строки и хэши sync-клиента redis — ровно то, чем пользуется сброс счётчиков."""
+
+    def __init__(self):
+        self.data: dict = {}
+        self.locked = False
+        self.lose_lock = False
+
+    def hincrby(self, key, field, amount):
+        h = self.data.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def rename(self, src, dst):
+        if src not in self.data:
+            raise ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, *args):
+        assert script == counters._ACK
+        (flushing, flush_id_key), (flush_id,) = args[:numkeys], args[numkeys:]
+        if self.data.get(flush_id_key) != flush_id:
+            return 0
+        return sum(self.data.pop(k, None) is not None for k in (flushing, flush_id_key))
+
+    def lock(self, name, timeout):
+        return FakeLock(self, self.lose_lock)
+
+
+class FakeDB:
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.flush_ids: set[str] = set()
+
+
+class FakeSession:
+    """AsyncSession поверх FakeDB: изменения видны только после commit."""
+
+    def __init__(self, db: FakeDB):
+        self.db = db
+        self.flush_ids: set[str] = set()
+        self.counts: dict[int, int] = {}
+        self.statements: list[str] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def _compile(self, stmt):
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        self.statements.append(str(compiled))
+        return compiled.params
+
+    async def scalar(self, stmt):
+        assert isinstance(stmt, Insert) and stmt.table.name == "counter_flushes"
+        flush_id = self._compile(stmt)["flush_id"]
+        if flush_id in self.db.flush_ids or flush_id in self.flush_ids:
+            return None  # ON CONFLICT DO NOTHING
+        self.flush_ids.add(flush_id)
+        return flush_id
+
+    async def execute(self, stmt):
+        params = list(self._compile(stmt).values())
+        if isinstance(stmt, Update):
+            for file_id, delta in zip(params[::2], params[1::2]):
+                self.counts[file_id] = self.counts.get(file_id, 0) + delta
+        else:
+            assert isinstance(stmt, Delete)
+
+    async def commit(self):
+        self.db.flush_ids |= self.flush_ids
+        for file_id, delta in self.counts.items():
+            self.db.counts[file_id] = self.db.counts.get(file_id, 0) + delta
+        self.flush_ids, self.counts = set(), {}
+
+
+def _download(r, *file_ids):
+    for file_id in file_ids:
+        r.hincrby(counters.DOWNLOADS_KEY, str(file_id), 1)
+
+
+def test_take_download_deltas_empty():
+    assert counters.take_download_deltas(FakeRedis()) == (None, {})
+
+
+def test_take_download_deltas_repeats_snapshot_until_ack():
+    r = FakeRedis()
+    _download(r, 1, 1, 2)
+    flush_id, deltas = counters.take_download_deltas(r)
+    assert flush_id and deltas == {1: 2, 2: 1}
+
+    _download(r, 1)  # новые скачивания копятся отдельно от снимка
+    assert counters.take_download_deltas(r) == (flush_id, deltas)
+
+    counters.ack_download_deltas(r, "stale")  # чужой id снимок не убирает
+    assert counters.take_download_deltas(r) == (flush_id, deltas)
+
+    counters.ack_download_deltas(r, flush_id)
+    next_id, next_deltas = counters.take_download_deltas(r)
+    assert next_id != flush_id and next_deltas == {1: 1}
+
+
+def test_apply_download_deltas_once():
+    db = FakeDB()
+    session = FakeSession(db)
+    assert run(counter_tasks.apply_download_deltas(session, "f1", {1: 2, 2: 1}))
+    assert "FROM (VALUES" in session.statements[1]  # один UPDATE на все файлы
+    run(session.commit())
+
+    session = FakeSession(db)
+    assert not run(counter_tasks.apply_download_deltas(session, "f1", {1: 2, 2: 1}))
+    assert len(session.statements) == 1  # только INSERT id снимка
+    run(session.commit())
+    assert db.counts == {1: 2, 2: 1}
+
+
+def _flush(monkeypatch, r, db, invalidated):
+    monkeypatch.setattr(counter_tasks, "get_sync_redis", lambda: r)
+    monkeypatch.setattr(counter_tasks.runtime, "session", lambda: FakeSession(db))
+    monkeypatch.setattr(counter_tasks, "invalidate_file_records_sync", lambda _, ids: invalidated.append(sorted(ids)))
+    return run(counter_tasks._flush_download_counters())
+
+
+def test_flush_download_counters(monkeypatch):
+    r, db, invalidated = FakeRedis(), FakeDB(), []
+    assert _flush(monkeypatch, r, db, invalidated) == 0
+
+    _download(r, 1, 1, 2)
+    assert _flush(monkeypatch, r, db, invalidated) == 2
+    assert db.counts == {1: 2, 2: 1}
+    assert invalidated == [[1, 2]]
+    assert not r.exists(counters.DOWNLOADS_FLUSHING_KEY) and not r.locked
+
+
+def test_flush_download_counters_crash_before_ack(monkeypatch):
+    r, db, invalidated = FakeRedis(), FakeDB(), []
+    _download(r, 1, 2)
+
+    def crash(*args):
+        raise ConnectionError("worker died between commit and ack")
+
+    monkeypatch.setattr(counter_tasks, "ack_download_deltas", crash)
+    try:
+        _flush(monkeypatch, r, db, invalidated)
+    except ConnectionError:
+        pass
+    assert db.counts == {1: 1, 2: 1}
+    assert not r.locked
+
+    # следующий сброс получает тот же снимок: в БД он уже есть — второй раз не применяется
+    monkeypatch.setattr(counter_tasks, "ack_download_deltas", counters.ack_download_deltas)
+    _download(r, 1)
+    assert _flush(monkeypatch, r, db, invalidated) == 0
+    assert db.counts == {1: 1, 2: 1}
+    assert _flush(monkeypatch, r, db, invalidated) == 1
+    assert db.counts == {1: 2, 2: 1}
+
+
+def test_flush_download_counters_skips_when_locked(monkeypatch):
+    r, db = FakeRedis(), FakeDB()
+    _download(r, 1)
+    r.locked = True
+    assert _flush(monkeypatch, r, db, []) == 0
+    assert db.counts == {}
+
+
+def test_flush_download_counters_lost_lock(monkeypatch):
+    r, db = FakeRedis(), FakeDB()
+    r.lose_lock = True  # сброс дольше таймаута лока: release бросает LockError
+    _download(r, 1)
+    assert _flush(monkeypatch, r, db, []) == 1
+    assert db.counts == {1: 1}
@@ -0,0 +1,73 @@
+import pytest
+
+from app.utils.http import RangeNotSatisfiable, if_none_match, if_range, parse_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=90-200", (90, 99)),  # конец за пределами файла обрезается
+        ("bytes=-10", (90, 99)),
+        ("bytes=-500", (0, 99)),  # суффикс длиннее файла — весь файл
+        ("Bytes = 5-5", (5, 5)),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [None, "", "items=0-9", "bytes=0-9,20-29", "bytes=abc", "bytes=-", "bytes=a-9", "bytes=9-3"],
+)
+def test_parse_range_ignored(header):
+    assert parse_range(header, 100) is None
+
+
+@pytest.mark.parametrize(
+    "header, size",
+    [
+        ("bytes=100-", 100),
+        ("bytes=100-", 50),
+        ("bytes=200-300", 100),
+        ("bytes=-0", 100),
+        ("bytes=0-", 0),
+        ("bytes=-5", 0),
+    ],
+)
+def test_parse_range_not_satisfiable(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+@pytest.mark.parametrize(
+    "header, etag, expected",
+    [
+        (None, '"a"', False),
+        ('"a"', '"a"', True),
+        ('"b", "a"', '"a"', True),
+        ('W/"a"', '"a"', True),  # If-None-Match сравнивает слабо
+        ('"a"', 'W/"a"', True),
+        ("*", '"a"', True),
+        ('"b"', '"a"', False),
+    ],
+)
+def test_if_none_match(header, etag, expected):
+    assert if_none_match(header, etag) is expected
+
+
+@pytest.mark.parametrize(
+    "header, etag, expected",
+    [
+        (None, '"a"', True),
+        ('"a"', '"a"', True),
+        (' "a" ', '"a"', True),
+        ('"b"', '"a"', False),
+        ('W/"a"', 'W/"a"', False),  # If-Range сравнивает сильно
+        ("Wed, 21 Oct 2015 07:28:00 GMT", '"a"', False),
+    ],
+)
+def test_if_range(header, etag, expected):
+    assert if_range(header, etag) is expected
@@ -0,0 +1,177 @@
+import io
+import struct
+import zipfile
+
+import pytest
+
+from app.services import metadata, msdoc
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _docx(body: str, core: str | None = None, document_name: str = "word/document.xml") -> bytes:
+    rels = (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        f'relationships/officeDocument" Target="{document_name}"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/'
+        'relationships/metadata/core-properties" Target="docProps/core.xml"/>'
+        "</Relationships>"
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("_rels/.rels", rels)
+        zf.writestr(document_name, f'<w:document xmlns:w="{W_NS}"><w:body>{body}</w:body></w:document>')
+        if core is not None:
+            zf.writestr(
+                "docProps/core.xml",
+                '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"'
+                ' xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">'
+                f"{core}</cp:coreProperties>",
+            )
+    return buf.getvalue()
+
+
+def _p(text: str) -> str:
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def _tbl(*rows: tuple[str, ...]) -> str:
+    cells = "".join("<w:tr>" + "".join(f"<w:tc>{_p(c)}</w:tc>" for c in row) + "</w:tr>" for row in rows)
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def test_extract_docx():
+    body = _p("First") + "<w:p/>" + _tbl(("a", "b"), ("c", "d")) + _p("Second") + "<w:sectPr/>"
+    core = (
+        "<dc:title>Report</dc:title><dc:creator>Ivanov</dc:creator>"
+        "<dcterms:created>2024-05-01T12:00:00+03:00</dcterms:created>"
+    )
+    meta, text = metadata.extract_docx(_docx(body, core), text_limit=1000)
+    # параграфы внутри таблицы и пустые параграфы не считаются
+    assert meta == {
+        "paragraphs": 2,
+        "tables": 1,
+        "title": "Report",
+        "author": "Ivanov",
+        "created": "2024-05-01 09:00:00",
+    }
+    assert text == "First\na\tb\nc\td\nSecond"
+
+
+def test_extract_docx_stream_and_limit():
+    data = _docx("".join(_p(f"paragraph {i}") for i in range(100)), document_name="word/document2.xml")
+    meta, text = metadata.extract_docx(io.BytesIO(data), text_limit=25)
+    assert meta["paragraphs"] == 100
+    assert meta["title"] == meta["author"] == meta["created"] == ""  # core.xml нет
+    assert text == "paragraph 0\nparagraph 1\np"
+
+
+def test_extract_document_cleans_control_chars(monkeypatch):
+    def fake_extractor(data, text_limit):
+        return {"title": "a\x00b\x01c", "nested": {"k\x00": ["x\x7fy", 1]}}, "line\x00\r\n\tnext\x0b"
+
+    monkeypatch.setitem(metadata.EXTRACTORS, "docx", fake_extractor)
+    meta, text = metadata.extract_document("DOCX", b"", 100)
+    assert meta == {"title": "ab c", "nested": {"k": ["x y", 1]}}
+    assert text == "line\r\n\tnext "
+
+
+# --- .doc: FIB и piece table собираем вручную ([MS-DOC] 2.5.1, 2.9.38) ---
+
+_TEXT_OFFSET = 1024
+
+
+def _word_document(text: str, ccp_text: int | None = None, nfib: int = 0x00C1, flags: int = 0) -> tuple[bytes, bytes]:
+    """(поток WordDocument, поток 0Table) с одним сжатым (cp1252) куском текста."""
+    encoded = text.encode("cp1252")
+    piece = struct.pack("<II", 0, len(encoded)) + struct.pack("<HIH", 0, (_TEXT_OFFSET * 2) | 0x40000000, 0)
+    table = b"\x01" + struct.pack("<h", 2) + b"\x00\x00" + b"\x02" + struct.pack("<I", len(piece)) + piece
+
+    fib = bytearray(_TEXT_OFFSET)
+    struct.pack_into("<HH", fib, 0, 0xA5EC, nfib)
+    struct.pack_into("<H", fib, 0x0A, flags)
+    pos = 32
+    struct.pack_into("<H", fib, pos, 14)  # csw
+    pos += 2 + 14 * 2
+    struct.pack_into("<H", fib, pos, 22)  # cslw
+    struct.pack_into("<i", fib, pos + 2 + 3 * 4, len(encoded) if ccp_text is None else ccp_text)
+    pos += 2 + 22 * 4
+    struct.pack_into("<H", fib, pos, 93)  # cbRgFcLcb
+    struct.pack_into("<II", fib, pos + 2 + 33 * 8, 0, len(table))  # fcClx, lcbClx
+    return bytes(fib) + encoded, table
+
+
+class FakeOle:
+    def __init__(self, streams: dict[str, bytes]):
+        self.streams = streams
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def exists(self, name):
+        return name in self.streams
+
+    def openstream(self, name):
+        return io.BytesIO(self.streams[name])
+
+
+def _ole(text: str, **kwargs) -> FakeOle:
+    word, table = _word_document(text, **kwargs)
+    return FakeOle({"WordDocument": word, "0Table": table})
+
+
+def test_read_main_text():
+    text = 'Title\r\x13 HYPERLINK "http://x" \x14link\x15 end\x0bnext\x0cpage\x01\r'
+    assert msdoc.read_main_text(_ole(text)) == "Title\rlink end\nnext\rpage\r"
+
+
+def test_read_main_text_stops_at_ccp_text():
+    # после основного текста идут колонтитулы/сноски — их не берём
+    assert msdoc.read_main_text(_ole("Body\rFooter\r", ccp_text=5)) == "Body\r"
+
+
+@pytest.mark.parametrize(
+    "kwargs, error",
+    [({"nfib": 0x0065}, "unsupported Word version"), ({"flags": 0x0100}, "encrypted")],
+)
+def test_read_main_text_unsupported(kwargs, error):
+    with pytest.raises(msdoc.UnsupportedDocError, match=error):
+        msdoc.read_main_text(_ole("x", **kwargs))
+
+
+def test_read_main_text_missing_table_stream():
+    word, _ = _word_document("x", flags=0x0200)  # текст ссылается на 1Table
+    with pytest.raises(msdoc.UnsupportedDocError, match="1Table"):
+        msdoc.read_main_text(FakeOle({"WordDocument": word, "0Table": b""}))
+
+
+def test_strip_fields_nested():
+    assert msdoc._strip_fields("a\x13 REF \x13 PAGE \x14 2\x15 \x14result\x15b") == "aresultb"
+
+
+@pytest.mark.parametrize(
+    "value, codepage, expected",
+    [
+        (None, 1251, ""),
+        ("Отчёт".encode("cp1251") + b"\x00", 1251, "Отчёт"),
+        ("Отчёт".encode("utf-16-le"), 1200, "Отчёт"),
+        ("Отчёт".encode(), 65001, "Отчёт"),
+        (b"abc", 99999, "abc"),  # неизвестная кодовая страница — latin-1
+        ("str", 1251, "str"),
+    ],
+)
+def test_decode(value, codepage, expected):
+    assert msdoc._decode(value, codepage) == expected
+
+
+def test_extract_doc(monkeypatch):
+    text = "Intro\r\rA1\x07B1\x07\x07A2\x07B2\x07\x07\rOutro\r"
+    monkeypatch.setattr(metadata.olefile, "OleFileIO", lambda stream: _ole(text))
+    monkeypatch.setattr(msdoc, "read_summary", lambda ole: {"title": "T", "author": "A", "created": ""})
+    meta, extracted = metadata.extract_doc(b"", text_limit=1000)
+    assert meta == {"paragraphs": 2, "tables": 1, "title": "T", "author": "A", "created": ""}
+    assert extracted == "Intro\nA1\tB1\t\tA2\tB2\nOutro"
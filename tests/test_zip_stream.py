@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+import pytest
+
+from app.services.zip_stream import ZipEntry, stream_zip, unique_names
+from conftest import run
+
+
+@pytest.mark.parametrize(
+    "names, expected",
+    [
+        (["a.pdf", "b.pdf"], ["a.pdf", "b.pdf"]),
+        (["a.pdf", "a.pdf", "a.pdf"], ["a.pdf", "a (2).pdf", "a (3).pdf"]),
+        # сгенерированное имя не должно совпасть с исходным
+        (["a.pdf", "a.pdf", "a (2).pdf"], ["a.pdf", "a (2).pdf", "a (2) (2).pdf"]),
+        (["a (2).pdf", "a.pdf", "a.pdf"], ["a (2).pdf", "a.pdf", "a (3).pdf"]),
+        (["dir/a.pdf", "dir\\a.pdf"], ["dir_a.pdf", "dir_a (2).pdf"]),
+        (["README", "README", ".env", ".env"], ["README", "README (2)", ".env", ".env (2)"]),
+        (["", ""], ["file", "file (2)"]),
+    ],
+)
+def test_unique_names(names, expected):
+    assert unique_names(names) == expected
+
+
+class FakeS3:
+    """Интерфейс AsyncS3Client, которым пользуется stream_zip: open_body + iter_body."""
+
+    def __init__(self, objects: dict[str, bytes]):
+        self.objects = objects
+
+    async def open_body(self, key, start=None, end=None):
+        return io.BytesIO(self.objects[key])
+
+    async def iter_body(self, body, chunk_size):
+        while chunk := body.read(chunk_size):
+            yield chunk
+
+
+async def _collect(s3, entries, **kwargs) -> bytes:
+    return b"".join([chunk async for chunk in stream_zip(s3, entries, **kwargs)])
+
+
+def test_stream_zip():
+    objects = {"k1": b"%PDF-1.7 " * 1000, "k2": b"", "k3": bytes(range(256)) * 10}
+    entries = [ZipEntry(f"{key}.bin", key, len(data)) for key, data in objects.items()]
+    data = run(_collect(FakeS3(objects), entries, window=2, queue_chunks=2, chunk_size=100))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["k1.bin", "k2.bin", "k3.bin"]
+        for key, content in objects.items():
+            info = zf.getinfo(f"{key}.bin")
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert zf.read(info) == content
+
+
+def test_stream_zip_empty():
+    data = run(_collect(FakeS3({}), []))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.namelist() == []
+
+
+def test_stream_zip_read_error():
+    entries = [ZipEntry("a", "present", 3), ZipEntry("b", "missing", 3)]
+    with pytest.raises(KeyError):
+        run(_collect(FakeS3({"present": b"abc"}), entries))